@@ -0,0 +1,234 @@
+"""
+Inference backends for the YOLO models
+The same Piece/Hand/Corner code can run an ultralytics .pt model through PyTorch, or an
+exported .onnx / OpenVINO model through a CPU-optimized runtime. Pre- and post-processing
+(letterbox, box decoding, NMS) for the exported formats is done in NumPy.
+"""
+import ast
+import os
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from typing import Any, Dict, List, Optional, Tuple
+
+# (boxes xyxy (N, 4), confidences (N,), class ids (N,)) for one frame
+Prediction = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def parseNames(names: Any) -> Dict[int, str]:
+    if isinstance(names, str):
+        names = ast.literal_eval(names)
+    if isinstance(names, (list, tuple)):
+        names = dict(enumerate(names))
+    return {int(k): str(v) for k, v in (names or {}).items()}
+
+
+def letterbox(frame: np.ndarray, size: Tuple[int, int]) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """Resize keeping aspect ratio and pad to size (h, w), as ultralytics does"""
+    h, w = frame.shape[:2]
+    th, tw = size
+    r = min(th / h, tw / w)
+    nh, nw = int(round(h * r)), int(round(w * r))
+    if (nh, nw) != (h, w):
+        frame = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    pw, ph = (tw - nw) / 2, (th - nh) / 2
+    top, bottom = int(round(ph - 0.1)), int(round(ph + 0.1))
+    left, right = int(round(pw - 0.1)), int(round(pw + 0.1))
+    out = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return out, r, (left, top)
+
+
+def preprocess(frames: List[np.ndarray], size: Tuple[int, int]):
+    """BGR frames -> float32 NCHW RGB blob in [0, 1] plus per-frame (ratio, pad)"""
+    imgs, metas = [], []
+    for frame in frames:
+        img, r, pad = letterbox(frame, size)
+        imgs.append(img)
+        metas.append((r, pad))
+    blob = np.stack(imgs)[..., ::-1].transpose(0, 3, 1, 2)
+    blob = np.ascontiguousarray(blob, dtype=np.float32) * (1.0 / 255.0)
+    return blob, metas
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou: float) -> np.ndarray:
+    """Greedy IoU suppression, returns kept indices sorted by score"""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    order = np.argsort(-scores)
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = (np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])).clip(0)
+        h = (np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])).clip(0)
+        inter = w * h
+        ovr = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[ovr <= iou]
+    return np.array(keep, dtype=np.int64)
+
+
+def postprocess(output: np.ndarray, metas, conf: float, iou: float, max_det: int = 300) -> List[Prediction]:
+    """Decode a YOLOv8 head output (B, 4 + nc, N) into per-frame predictions"""
+    preds: List[Prediction] = []
+    for out, (r, (padx, pady)) in zip(output, metas):
+        out = out.T  # (N, 4 + nc)
+        scores = out[:, 4:]
+        cls = scores.argmax(axis=1)
+        score = scores[np.arange(len(scores)), cls]
+        mask = score > conf
+        if not mask.any():
+            preds.append((np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int32)))
+            continue
+        xywh, score, cls = out[mask, :4], score[mask], cls[mask]
+        boxes = np.empty_like(xywh)
+        boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+        # Class-aware NMS by offsetting boxes per class
+        keep = nms(boxes + cls[:, None] * 7680.0, score, iou)[:max_det]
+        boxes, score, cls = boxes[keep], score[keep], cls[keep]
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - padx) / r
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pady) / r
+        preds.append((boxes.astype(np.float32), score.astype(np.float32), cls.astype(np.int32)))
+    return preds
+
+
+class UltralyticsBackend():
+    """PyTorch path through ultralytics (the original behaviour)"""
+    name = "pytorch"
+
+    def __init__(self, path: str, device: Optional[str] = None):
+        from ultralytics import YOLO
+        self.model = YOLO(path)
+        self.names = parseNames(self.model.names)
+        # None lets ultralytics pick (first CUDA device when available)
+        self.device = device
+
+    def __call__(self, source, **kwargs):
+        # Raw ultralytics results, for callers that still consume them directly
+        return self.model(source, **kwargs)
+
+    def predict(self, frames: List[np.ndarray], conf: float = 0.50, iou: float = 0.5,
+                imgsz: Optional[int] = None) -> List[Prediction]:
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        if self.device is not None:
+            kwargs["device"] = self.device
+        preds: List[Prediction] = []
+        for r in self.model(frames, conf=conf, iou=iou, verbose=False, **kwargs):
+            if r.boxes is None:
+                preds.append((np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int32)))
+                continue
+            preds.append((r.boxes.xyxy.cpu().numpy(), r.boxes.conf.cpu().numpy(), r.boxes.cls.cpu().numpy()))
+        return preds
+
+
+class _ExportedBackend():
+    """Common NumPy pre/post-processing for exported models"""
+    imgsz: Tuple[int, int] = (640, 640)
+    fixed_batch: Optional[int] = 1
+
+    def infer(self, blob: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def predict(self, frames: List[np.ndarray], conf: float = 0.50, iou: float = 0.5,
+                imgsz: Optional[int] = None) -> List[Prediction]:
+        # Exported graphs have a fixed input size; imgsz is only honoured by the PyTorch path
+        blob, metas = preprocess(frames, self.imgsz)
+        if self.fixed_batch and len(frames) != self.fixed_batch:
+            output = np.concatenate([self.infer(blob[i:i + 1]) for i in range(len(frames))])
+        else:
+            output = self.infer(blob)
+        return postprocess(output, metas, conf, iou)
+
+
+class OnnxBackend(_ExportedBackend):
+    name = "onnxruntime"
+
+    def __init__(self, path: str, threads: Optional[int] = None):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        b, _, h, w = inp.shape
+        self.fixed_batch = b if isinstance(b, int) else None
+        meta = self.session.get_modelmeta().custom_metadata_map
+        if isinstance(h, int) and isinstance(w, int):
+            self.imgsz = (h, w)
+        elif "imgsz" in meta:
+            self.imgsz = tuple(ast.literal_eval(meta["imgsz"]))
+        self.names = parseNames(meta.get("names", {}))
+
+    def infer(self, blob: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoBackend(_ExportedBackend):
+    name = "openvino"
+
+    def __init__(self, path: str, threads: Optional[int] = None):
+        import openvino as ov
+        p = Path(path)
+        xml = p if p.suffix == ".xml" else next(p.glob("*.xml"))
+        core = ov.Core()
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        self.compiled = core.compile_model(core.read_model(str(xml)), "CPU", config)
+        shape = self.compiled.input(0).get_partial_shape()
+        b, _, h, w = shape
+        self.fixed_batch = b.get_length() if b.is_static else None
+        if h.is_static and w.is_static:
+            self.imgsz = (h.get_length(), w.get_length())
+        self.names = self._readNames(xml.parent / "metadata.yaml")
+
+    @staticmethod
+    def _readNames(path: Path) -> Dict[int, str]:
+        if not path.exists():
+            return {}
+        import yaml
+        with open(path) as f:
+            return parseNames(yaml.safe_load(f).get("names", {}))
+
+    def infer(self, blob: np.ndarray) -> np.ndarray:
+        return self.compiled(blob)[0]
+
+
+def resolveModelPath(path: str, variant: Optional[str] = None) -> str:
+    """Path of a model variant next to the FP32 model
+
+    variant None / "fp32" keeps path; any other variant ("int8", ...) resolves
+    models/modelPiece.pt -> models/modelPiece_int8.onnx as written by quantize_models.py.
+    """
+    if not variant or variant == "fp32":
+        return path
+    p = Path(path)
+    return str(p.with_name(f"{p.stem}_{variant}.onnx"))
+
+
+def loadBackend(path: str, backend: Optional[str] = None, device: Optional[str] = None, **kwargs):
+    """Pick a backend from the model path (.pt / .onnx / OpenVINO .xml or *_openvino_model dir)
+
+    backend can force one of "pytorch", "onnxruntime", "openvino".
+    device ("cpu", "cuda:0", ...) is honoured by the PyTorch path; exported models run on CPU only.
+    """
+    p = str(path)
+    if backend is None:
+        if p.endswith(".onnx"):
+            backend = "onnxruntime"
+        elif p.endswith(".xml") or p.rstrip("/").endswith("_openvino_model") or os.path.isdir(p):
+            backend = "openvino"
+        else:
+            backend = "pytorch"
+    if backend != "pytorch" and device not in (None, "cpu"):
+        raise ValueError(f"{backend} backend runs on cpu only, got device {device!r}")
+    if backend == "onnxruntime":
+        return OnnxBackend(p, **kwargs)
+    if backend == "openvino":
+        return OpenVinoBackend(p, **kwargs)
+    return UltralyticsBackend(p, device=device)
@@ -0,0 +1,96 @@
+"""
+Latency comparison of inference backends on the same recorded frames
+Example:
+    python bench_backends.py --source test/video1.mp4 \\
+        models/modelPiece.pt models/modelPiece.onnx models/modelPiece_openvino_model
+The first model is the reference; detections of the others are compared against it.
+"""
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from backends import loadBackend
+
+
+def loadRecordedFrames(source, limit):
+    """Frames from a video file or a directory of images"""
+    frames = []
+    if os.path.isdir(source):
+        for path in sorted(glob.glob(os.path.join(source, "*")))[:limit]:
+            img = cv2.imread(path)
+            if img is not None:
+                frames.append(img)
+        return frames
+    cam = cv2.VideoCapture(source)
+    while len(frames) < limit:
+        ok, frame = cam.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cam.release()
+    return frames
+
+
+def matchRate(ref, pred, iou_thr=0.5):
+    """Fraction of reference boxes matched by a same-class box with IoU >= iou_thr"""
+    rb, _, rc = ref
+    pb, _, pc = pred
+    if len(rb) == 0:
+        return 1.0 if len(pb) == 0 else 0.0
+    if len(pb) == 0:
+        return 0.0
+    x1 = np.maximum(rb[:, None, 0], pb[None, :, 0])
+    y1 = np.maximum(rb[:, None, 1], pb[None, :, 1])
+    x2 = np.minimum(rb[:, None, 2], pb[None, :, 2])
+    y2 = np.minimum(rb[:, None, 3], pb[None, :, 3])
+    inter = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    ra = (rb[:, 2] - rb[:, 0]) * (rb[:, 3] - rb[:, 1])
+    pa = (pb[:, 2] - pb[:, 0]) * (pb[:, 3] - pb[:, 1])
+    iou = inter / (ra[:, None] + pa[None, :] - inter + 1e-9)
+    same = rc[:, None].astype(int) == pc[None, :].astype(int)
+    return float(((iou >= iou_thr) & same).any(axis=1).mean())
+
+
+def run(backend, frames, conf, iou):
+    backend.predict(frames[:1], conf=conf, iou=iou)  # warm-up
+    times, preds = [], []
+    for frame in frames:
+        t0 = time.perf_counter()
+        preds.append(backend.predict([frame], conf=conf, iou=iou)[0])
+        times.append((time.perf_counter() - t0) * 1000.0)
+    return np.array(times), preds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PyTorch / ONNX Runtime / OpenVINO latency")
+    parser.add_argument("models", nargs="+", help="model paths, the first one is the reference")
+    parser.add_argument("--source", required=True, help="recorded video file or image directory")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--conf", type=float, default=0.50)
+    parser.add_argument("--iou", type=float, default=0.5)
+    args = parser.parse_args()
+
+    frames = loadRecordedFrames(args.source, args.frames)
+    if not frames:
+        raise SystemExit(f"No frames read from {args.source}")
+    print(f"[BENCH] {len(frames)} frames from {args.source}")
+
+    print(f"{'backend':<12} | {'model':<40} | {'mean ms':>8} | {'p50':>7} | {'p95':>7} | {'match':>6}")
+    print("-" * 96)
+    reference = None
+    for path in args.models:
+        backend = loadBackend(path)
+        times, preds = run(backend, frames, args.conf, args.iou)
+        if reference is None:
+            reference = preds
+        match = np.mean([matchRate(r, p) for r, p in zip(reference, preds)])
+        print(f"{backend.name:<12} | {os.path.basename(path.rstrip('/')):<40} | {times.mean():8.2f} | "
+              f"{np.percentile(times, 50):7.2f} | {np.percentile(times, 95):7.2f} | {match:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
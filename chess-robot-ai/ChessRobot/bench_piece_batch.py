@@ -0,0 +1,77 @@
+"""
+Throughput benchmark for Piece.detectPieces vs Piece.detectPiecesBatch
+Runs the piece model with batch sizes 1/2/4/8 (on CPU unless --device says otherwise) and prints frames per second
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from piece import Piece
+
+
+def loadFrames(source, count, width, height):
+    """Read `count` frames from a video file / camera index, or make synthetic ones"""
+    frames = []
+    if source is not None:
+        cam = cv2.VideoCapture(int(source) if source.isdigit() else source)
+        while len(frames) < count:
+            ok, frame = cam.read()
+            if not ok:
+                break
+            frames.append(frame)
+        cam.release()
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+    # Pad a short video by cycling through the frames that were read
+    src = list(frames)
+    for i in range(count - len(src)):
+        frames.append(src[i % len(src)])
+    return frames
+
+
+def benchmark(piece, frames, batch_size, repeat):
+    # Warm-up so the first-call allocation cost does not skew batch size 1
+    piece.detectPiecesBatch(frames[:batch_size], batch_size=batch_size)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if batch_size == 1:
+            for frame in frames:
+                piece.detectPieces(frame)
+        else:
+            piece.detectPiecesBatch(frames, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    n = len(frames) * repeat
+    return n / elapsed, elapsed * 1000.0 / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Piece model batch throughput benchmark")
+    parser.add_argument("--model", default="models/modelPiece.pt")
+    parser.add_argument("--source", default=None, help="video file or camera index (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--batch-sizes", default="1,2,4,8")
+    parser.add_argument("--device", default="cpu", help="inference device, e.g. cpu or cuda:0")
+    args = parser.parse_args()
+
+    piece = Piece(args.model, device=args.device)
+    frames = loadFrames(args.source, args.frames, args.width, args.height)
+
+    print(f"device: {args.device} ({piece.model.name})")
+    print(f"{'batch':>5} | {'fps':>8} | {'ms/frame':>8}")
+    print("-" * 28)
+    base = None
+    for bs in [int(b) for b in args.batch_sizes.split(",")]:
+        fps, ms = benchmark(piece, frames, bs, args.repeat)
+        base = base or fps
+        print(f"{bs:>5} | {fps:8.2f} | {ms:8.2f}  (x{fps / base:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Black-box recorder for post-mortems
+An always-on ring buffer of the last seconds of the detection loop: downscaled frames, the
+piece detections, the FEN candidate and the updateFEN decision. Every array is allocated
+once, up front, under a memory cap; recording a frame is a resize into a preallocated slot
+plus a few scalar writes. dump() snapshots the ring in chronological order to a compressed
+.npz file (on a TCP command, or automatically on illegal_move / game_over); dumps are limited
+to one per reason per min_interval and only the newest max_dumps files are kept.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+FEN_BYTES = 96
+DECISION_BYTES = 24
+
+
+class BlackBox():
+    def __init__(self, seconds: float = 60, rate: float = 15, size=(160, 120), max_boxes: int = 48,
+                 max_bytes: int = 64 << 20, out_dir: str = "blackbox", min_interval: float = 30.0,
+                 max_dumps: int = 20):
+        """
+        Args:
+            seconds: History to keep at the given rate
+            rate: Frames per second kept when a frame carries nothing else (no detections/FEN)
+            size: (width, height) of the stored frames
+            max_boxes: Detections stored per frame, extra boxes are dropped
+            max_bytes: Memory cap, reduces the number of slots if seconds * rate does not fit
+            out_dir: Directory for dumps
+            min_interval: Seconds before another dump with the same reason is written
+            max_dumps: Dumps kept in out_dir, older ones are deleted
+        """
+        w, h = size
+        per_slot = w * h * 3 + max_boxes * (4 * 4 + 4 + 2) + 2 * FEN_BYTES + DECISION_BYTES + 8 + 2
+        self.capacity = max(1, min(int(seconds * rate), max_bytes // per_slot))
+        self.size = size
+        self.interval = 1.0 / rate
+        self.max_boxes = max_boxes
+        self.out_dir = out_dir
+        self.min_interval = min_interval
+        self.max_dumps = max_dumps
+        self.last_dump = {}
+        n = self.capacity
+        self.ts = np.zeros(n, np.float64)
+        self.frames = np.zeros((n, h, w, 3), np.uint8)
+        self.nbox = np.zeros(n, np.int16)
+        self.boxes = np.zeros((n, max_boxes, 4), np.float32)
+        self.confs = np.zeros((n, max_boxes), np.float32)
+        self.cls = np.zeros((n, max_boxes), np.int16)
+        self.fen = np.zeros(n, f"S{FEN_BYTES}")
+        self.decision = np.zeros(n, f"S{DECISION_BYTES}")
+        self.fen_last = np.zeros(n, f"S{FEN_BYTES}")
+        self.names = None
+        self.count = 0
+        self.lock = threading.Lock()
+        log.info("[BLACKBOX] %d slots of %dx%d (%.1f MiB)", n, w, h, n * per_slot / 2**20)
+
+    def record(self, frame: np.ndarray, detections=None, fen: Optional[str] = None) -> bool:
+        """Store one loop iteration; plain frames are thinned to the configured rate"""
+        now = time.time()
+        if detections is None and fen is None and self.count and now - self.ts[(self.count - 1) % self.capacity] < self.interval:
+            return False
+        with self.lock:
+            i = self.count % self.capacity
+            cv2.resize(frame, self.size, dst=self.frames[i], interpolation=cv2.INTER_NEAREST)
+            self.ts[i] = now
+            k = 0
+            if detections is not None:
+                k = min(len(detections), self.max_boxes)
+                self.boxes[i, :k] = detections.boxes[:k]
+                self.confs[i, :k] = detections.confs[:k]
+                self.cls[i, :k] = detections.cls[:k]
+                self.names = detections.names
+            self.nbox[i] = k
+            self.fen[i] = fen.encode() if fen else b""
+            self.decision[i] = b""
+            self.fen_last[i] = b""
+            self.count += 1
+        return True
+
+    def decide(self, decision: str, fen_last: Optional[str] = None):
+        """Attach the updateFEN outcome to the most recent frame"""
+        if not self.count:
+            return
+        with self.lock:
+            i = (self.count - 1) % self.capacity
+            self.decision[i] = decision.encode()[:DECISION_BYTES]
+            if fen_last:
+                self.fen_last[i] = fen_last.encode()[:FEN_BYTES]
+
+    def snapshot(self) -> dict:
+        """Copy of the ring in chronological order"""
+        with self.lock:
+            n = min(self.count, self.capacity)
+            order = (np.arange(n) + self.count - n) % self.capacity
+            return {
+                "ts": self.ts[order], "frames": self.frames[order], "nbox": self.nbox[order],
+                "boxes": self.boxes[order], "confs": self.confs[order], "cls": self.cls[order],
+                "fen": self.fen[order], "decision": self.decision[order], "fen_last": self.fen_last[order],
+            }
+
+    def dump(self, reason: str = "manual", **meta) -> Optional[str]:
+        """
+        Write the ring to out_dir/blackbox_<time>_<reason>.npz; blocking, call off the event loop
+        Returns None when the ring is empty or a dump with this reason was written less than
+        min_interval seconds ago (a flickering illegal position must not fill the disk).
+        """
+        now = time.monotonic()
+        last = self.last_dump.get(reason)
+        if last is not None and now - last < self.min_interval:
+            log.debug("[BLACKBOX] Skipping %s dump, last one %.0fs ago", reason, now - last)
+            return None
+        data = self.snapshot()
+        if not len(data["ts"]):
+            return None
+        self.last_dump[reason] = now
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f"blackbox_{time.strftime('%Y%m%d_%H%M%S')}_{reason}.npz")
+        info = {"reason": reason, "names": self.names, "size": list(self.size), **meta}
+        np.savez_compressed(path, meta=np.array(json.dumps(info, default=str)), **data)
+        log.info("[BLACKBOX] Dumped %d frames to %s (%.1f MiB)", len(data["ts"]), path, os.path.getsize(path) / 2**20)
+        self.prune()
+        return path
+
+    def prune(self):
+        """Delete the oldest dumps beyond max_dumps"""
+        dumps = sorted(glob.glob(os.path.join(self.out_dir, "blackbox_*.npz")), key=os.path.getmtime)
+        for old in dumps[:max(0, len(dumps) - self.max_dumps)]:
+            try:
+                os.remove(old)
+            except OSError as e:
+                log.warning("[BLACKBOX] Could not remove %s: %s", old, e)
@@ -0,0 +1,87 @@
+"""
+Board-ROI warping
+Warps the board region of a camera frame onto a small fixed canvas using the homography
+computed once from the detected corners, so the piece model only sees the board.
+Corners must be in the coordinates of the frame being warped (see Piece.processCorners).
+"""
+import cv2
+import numpy as np
+
+from typing import Optional, Tuple
+
+
+def orderCorners(pts: np.ndarray) -> np.ndarray:
+    """Order 4 points as top-left, top-right, bottom-right, bottom-left"""
+    pts = np.asarray(pts, dtype=np.float32).reshape(-1, 2)
+    if len(pts) != 4:
+        raise ValueError(f"Expected 4 board corners, got {len(pts)}")
+    s = pts.sum(axis=1)
+    d = pts[:, 1] - pts[:, 0]
+    return np.array([pts[np.argmin(s)], pts[np.argmin(d)], pts[np.argmax(s)], pts[np.argmax(d)]], dtype=np.float32)
+
+
+def boardQuad(pts, shape, min_area: float = 0.01) -> np.ndarray:
+    """
+    Validated, ordered board quad in a frame of the given shape
+    
+    Raises:
+        ValueError: Not 4 finite points, not a convex quad, or smaller than min_area of the frame
+    """
+    quad = orderCorners(pts)
+    if not np.isfinite(quad).all():
+        raise ValueError("Board corners are not finite")
+    h, w = shape[:2]
+    if not cv2.isContourConvex(quad.reshape(-1, 1, 2)):
+        raise ValueError("Board corners do not form a convex quad")
+    if cv2.contourArea(quad) < min_area * w * h:
+        raise ValueError("Board region is too small")
+    return quad
+
+
+class BoardWarp():
+    def __init__(self, size: int = 320, margin: float = 0.12):
+        """
+        Args:
+            size: Canvas width/height in pixels fed to the piece model
+            margin: Fraction of the canvas kept around the board so tall pieces on the
+                    edge ranks/files are not cut off
+        """
+        self.size = int(size)
+        self.margin = int(round(self.size * margin))
+        self.boardSize = self.size - 2 * self.margin
+        self.H: Optional[np.ndarray] = None
+        self.Hinv: Optional[np.ndarray] = None
+        self._key: Optional[bytes] = None
+
+        # Canvas pixels -> board pixels (board square starts at the margin)
+        self.canvasToBoard = np.array([[1.0, 0.0, -self.margin],
+                                       [0.0, 1.0, -self.margin],
+                                       [0.0, 0.0, 1.0]])
+
+    def update(self, cornersH) -> np.ndarray:
+        """Recompute the homography only when the corners change"""
+        pts = np.asarray(cornersH, dtype=np.float32)
+        key = pts.tobytes()
+        if key != self._key:
+            m, b = self.margin, self.boardSize
+            dst = np.array([[m, m], [m + b, m], [m + b, m + b], [m, m + b]], dtype=np.float32)
+            self.H = cv2.getPerspectiveTransform(orderCorners(pts), dst)
+            self.Hinv = np.linalg.inv(self.H)
+            self._key = key
+        return self.H
+
+    def warp(self, frame: np.ndarray, cornersH=None) -> np.ndarray:
+        if cornersH is not None:
+            self.update(cornersH)
+        if self.H is None:
+            raise RuntimeError("Board corners not set")
+        return cv2.warpPerspective(frame, self.H, (self.size, self.size), flags=cv2.INTER_LINEAR)
+
+    def toImage(self, pts: np.ndarray) -> np.ndarray:
+        """Map (N, 2) canvas points back into the camera frame"""
+        pts = np.asarray(pts, dtype=np.float32).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(pts, self.Hinv).reshape(-1, 2)
+
+    def boardSpace(self) -> Tuple[np.ndarray, int]:
+        """(H, size) pair to pass to Detections.assignCells for canvas detections"""
+        return self.canvasToBoard, self.boardSize
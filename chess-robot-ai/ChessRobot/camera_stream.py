@@ -2,12 +2,81 @@
 HTTP/MJPEG Camera Streaming Server
 Streams raw camera feed with low resolution for smooth performance
 """
+import asyncio
 import cv2
+import hashlib
+import logging
+import numpy as np
 import threading
+from collections import OrderedDict
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
 import time
 
+import metrics
+
+log = logging.getLogger(__name__)
+
+FRAMES_CAPTURED = metrics.counter("stream_frames_captured_total", "Frames read from the camera")
+FRAMES_STATIC = metrics.counter("stream_frames_static_total", "Captured frames skipped as unchanged")
+FRAMES_ENCODED = metrics.counter("stream_frames_encoded_total", "JPEG encodes (all renditions)")
+ENCODE_SECONDS = metrics.histogram("stream_encode_seconds", "Resize + JPEG encode time per encode")
+CLIENTS = metrics.gauge("stream_clients", "Connected stream clients")
+BYTES_SENT = metrics.counter("stream_bytes_sent_total", "Bytes of JPEG parts written to clients")
+FRAMES_DROPPED = metrics.counter("stream_frames_dropped_total", "Frames dropped for slow clients")
+
+# Quality ladder shared by all clients: (rendition, JPEG quality), worst to best
+QUALITY_STEPS = [("low", 40), ("low", 60), ("mid", 50), ("mid", 70), ("high", 70), ("high", 85)]
+# Starting (and highest) step for each ?res= value
+RES_STEPS = {"low": 1, "mid": 3, "high": 5}
+
+
+class QualityController:
+    """
+    Per-client adaptive quality
+    Tracks how long sending a frame to this client takes relative to the frame interval and
+    moves down the QUALITY_STEPS ladder when the socket backs up, back up when it drains.
+    """
+    
+    def __init__(self, res="mid", fps=25, slow=0.5, fast=0.15, cooldown=10):
+        """
+        Args:
+            res: Requested rendition, the controller never goes above it
+            fps: Stream frame rate, defines the send-time budget
+            slow: Step down when the smoothed send time exceeds this fraction of a frame interval
+            fast: Step up when it stays below this fraction
+            cooldown: Frames to wait between two steps
+        """
+        self.max_step = RES_STEPS.get(res, RES_STEPS["mid"])
+        self.step = self.max_step
+        self.interval = 1.0 / fps
+        self.slow = slow
+        self.fast = fast
+        self.cooldown = cooldown
+        self.send_time = 0.0
+        self.since_change = 0
+        
+    @property
+    def key(self):
+        return QUALITY_STEPS[self.step]
+        
+    def update(self, send_time):
+        """Record one frame's send time; returns True when the step changed"""
+        self.send_time = 0.8 * self.send_time + 0.2 * send_time
+        self.since_change += 1
+        if self.since_change < self.cooldown:
+            return False
+        ratio = self.send_time / self.interval
+        if ratio > self.slow and self.step > 0:
+            self.step -= 1
+        elif ratio < self.fast and self.step < self.max_step:
+            self.step += 1
+        else:
+            return False
+        self.since_change = 0
+        return True
+
 class CameraStream:
     def __init__(self, camera_index=0, width=640, height=480, fps=30):
         """
@@ -25,7 +94,42 @@ class CameraStream:
         self.fps = fps
         
         self.frame = None
+        self.source = None
+        self.jpeg = None
+        self.seq = 0
+        self.jpeg_quality = 70
+        # Stream ladder: rendition -> (width, height), "mid" is the configured size
+        self.renditions = {"low": (width // 2, height // 2), "mid": (width, height), "high": (width * 2, height * 2)}
+        # Encodings of the current frame keyed by (rendition, quality); replaced on every new frame
+        self._encoded = {}
+        self.encode_lock = threading.Lock()
+        # Static-scene suppression: near-identical frames are not re-encoded or re-sent,
+        # only a keepalive re-publish of the last JPEG every keepalive_interval seconds
+        self.static_threshold = 8
+        self.keepalive_interval = 1.0
+        self._thumb = None
+        self._published_at = 0.0
+        self.frames_captured = 0
+        self.frames_static = 0
+        self.keepalives = 0
+        # Detection overlay for /annotated: the detection loop hands over its raw result once
+        # per cycle, boxes are drawn and encoded only when a client asks for that cycle
+        self.annotated = None
+        self.annotation_seq = 0
+        self._annotation = None
+        # Overlay drawing and board rendering; separate from encode_lock so they never stall the capture encode
+        self.render_lock = threading.Lock()
+        # Rendered board for /board.png, keyed by FEN: fen -> (etag, png bytes)
+        self.board_fen = None
+        self._boards = OrderedDict()
+        self.board_cache_size = 32
         self.lock = threading.Lock()
+        # Signalled once per newly encoded frame
+        self.new_frame = threading.Condition(self.lock)
+        # Callbacks (seq, jpeg) invoked from the capture thread for every new frame
+        self.listeners = []
+        # Callbacks (annotation_seq) invoked from the detection loop for every published cycle
+        self.annotation_listeners = []
         self.running = False
         self.capture_thread = None
         
@@ -42,38 +146,226 @@ class CameraStream:
         self.running = True
         self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
         self.capture_thread.start()
-        print(f"[CAMERA STREAM] Started capturing at {self.width}x{self.height} @ {self.fps}fps")
+        log.info("[CAMERA STREAM] Started capturing at %dx%d @ %sfps", self.width, self.height, self.fps)
+        
+    def _is_static(self, frame):
+        """Cheap downsampled difference against the last published frame"""
+        thumb = cv2.resize(frame, (48, 36), interpolation=cv2.INTER_AREA)
+        if thumb.ndim == 3:
+            thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        thumb = thumb.astype(np.int16)
+        if self._thumb is not None and np.abs(thumb - self._thumb).max() <= self.static_threshold:
+            return True
+        self._thumb = thumb
+        return False
+        
+    def _keepalive(self):
+        """Re-publish the last JPEG under a new sequence number, without re-encoding"""
+        with self.new_frame:
+            if self.jpeg is None:
+                return
+            self.seq += 1
+            self.keepalives += 1
+            self.new_frame.notify_all()
+            seq, data = self.seq, self.jpeg
+        self._published_at = time.monotonic()
+        for listener in self.listeners:
+            listener(seq, data)
         
     def _capture_loop(self):
-        """Internal loop to capture frames"""
+        """Internal loop to capture frames, each new frame is JPEG-encoded exactly once"""
         while self.running:
             ret, frame = self.cam.read()
             if ret:
+                self.frames_captured += 1
+                FRAMES_CAPTURED.inc()
+                if self._is_static(frame):
+                    self.frames_static += 1
+                    FRAMES_STATIC.inc()
+                    if time.monotonic() - self._published_at >= self.keepalive_interval:
+                        self._keepalive()
+                    time.sleep(1.0 / self.fps)
+                    continue
+                
+                start = time.perf_counter()
                 # Resize to low resolution for smooth streaming
                 frame_resized = cv2.resize(frame, (self.width, self.height))
                 
-                with self.lock:
-                    self.frame = frame_resized.copy()
+                # Encode outside the lock so viewers never wait on the encoder
+                ok, jpeg = cv2.imencode('.jpg', frame_resized, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                ENCODE_SECONDS.observe(time.perf_counter() - start)
+                FRAMES_ENCODED.inc()
+                with self.new_frame:
+                    self.frame = frame_resized
+                    self.source = frame
+                    if ok:
+                        self.jpeg = jpeg.tobytes()
+                        self.seq += 1
+                        # Other renditions are encoded on first request, once per frame
+                        self._encoded = {("mid", None): frame_resized, ("mid", self.jpeg_quality): self.jpeg}
+                        self.new_frame.notify_all()
+                    seq, data = self.seq, self.jpeg
+                if ok:
+                    self._published_at = time.monotonic()
+                    for listener in self.listeners:
+                        listener(seq, data)
             time.sleep(1.0 / self.fps)
             
     def get_frame(self):
         """Get current frame as JPEG bytes"""
         with self.lock:
-            if self.frame is None:
-                return None
+            return self.jpeg
+
+    def get_encoded(self, rendition="mid", quality=None):
+        """
+        JPEG of the current frame for a rendition/quality, encoded at most once per frame
+        
+        Returns:
+            (seq, jpeg bytes)
+        """
+        quality = quality or self.jpeg_quality
+        with self.lock:
+            seq, cache, source = self.seq, self._encoded, self.source
+            data = cache.get((rendition, quality))
+        if data is not None or source is None:
+            return seq, data
+        
+        with self.encode_lock:
+            # Another client may have produced it while we waited
+            data = cache.get((rendition, quality))
+            if data is None:
+                start = time.perf_counter()
+                img = cache.get((rendition, None))
+                if img is None:
+                    w, h = self.renditions.get(rendition, self.renditions["mid"])
+                    sh, sw = source.shape[:2]
+                    if w >= sw or h >= sh:
+                        img = source
+                    else:
+                        img = cv2.resize(source, (w, h), interpolation=cv2.INTER_AREA)
+                    cache[(rendition, None)] = img
+                ok, jpeg = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                data = jpeg.tobytes() if ok else None
+                cache[(rendition, quality)] = data
+                ENCODE_SECONDS.observe(time.perf_counter() - start)
+                FRAMES_ENCODED.inc()
+        return seq, data
+
+    def wait_frame(self, last_seq=0, timeout=1.0, rendition="mid", quality=None):
+        """
+        Block until a frame newer than last_seq has been encoded
+        
+        Returns:
+            (seq, jpeg bytes), or (last_seq, None) on timeout / stop
+        """
+        with self.new_frame:
+            if not self.new_frame.wait_for(lambda: self.seq != last_seq or not self.running, timeout):
+                return last_seq, None
+            if self.seq == last_seq:
+                return last_seq, None
+            if rendition == "mid" and quality in (None, self.jpeg_quality):
+                return self.seq, self.jpeg
+        return self.get_encoded(rendition, quality)
+        
+    def publish_detections(self, frame, detections, draw, warp=None):
+        """
+        Hand over one detection cycle for /annotated (cheap, nothing is drawn here)
+        
+        Args:
+            frame: Frame the detections were run on (before any board warp)
+            detections: Detections of that frame
+            draw: Callable (frame, detections) -> annotated image, e.g. Piece.visualizePieces
+            warp: BoardWarp when detection ran on the warped board, None for the full frame
+        """
+        with self.new_frame:
+            self._annotation = (frame, detections, draw, warp)
+            self.annotation_seq += 1
+            self.new_frame.notify_all()
+            seq = self.annotation_seq
+        for listener in self.annotation_listeners:
+            listener(seq)
             
-            # Encode frame as JPEG with quality for smooth streaming
-            ret, jpeg = cv2.imencode('.jpg', self.frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-            if ret:
-                return jpeg.tobytes()
-        return None
+    def get_annotated(self):
+        """
+        JPEG of the latest detection cycle with boxes drawn, rendered at most once per cycle
+        
+        Returns:
+            (annotation_seq, jpeg bytes), jpeg is None before the first cycle
+        """
+        with self.render_lock:
+            with self.lock:
+                seq, pending, self._annotation = self.annotation_seq, self._annotation, None
+                if pending is not None:
+                    # The detection loop may reuse its frame buffer; draw on our own copy
+                    frame, detections, draw, warp = pending
+                    frame = frame.copy()
+            if pending is not None:
+                if warp is not None and warp.H is not None:
+                    frame = warp.warp(frame)
+                img = draw(frame, detections)
+                h, w = img.shape[:2]
+                scale = min(self.width / w, self.height / h)
+                if scale < 1:
+                    img = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+                ok, jpeg = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if ok:
+                    self.annotated = (seq, jpeg.tobytes())
+        return self.annotated or (0, None)
+        
+    def wait_annotated(self, last_seq=0, timeout=1.0):
+        """
+        Block until a detection cycle newer than last_seq has been published
+        
+        Returns:
+            (annotation_seq, jpeg bytes), or (last_seq, None) on timeout / stop
+        """
+        with self.new_frame:
+            if not self.new_frame.wait_for(lambda: self.annotation_seq != last_seq or not self.running, timeout):
+                return last_seq, None
+            if self.annotation_seq == last_seq:
+                return last_seq, None
+        return self.get_annotated()
+        
+    def publish_fen(self, fen):
+        """Set the FEN shown by /board.png"""
+        self.board_fen = fen
+        
+    def get_board_png(self, fen=None):
+        """
+        Rendered board as PNG, cached by FEN
+        
+        Args:
+            fen: FEN to render (default: the last published FEN)
+            
+        Returns:
+            (etag, png bytes), or (None, None) when there is nothing to render
+        """
+        fen = fen or self.board_fen
+        if not fen:
+            return None, None
+        with self.render_lock:
+            cached = self._boards.get(fen)
+            if cached is not None:
+                self._boards.move_to_end(fen)
+                return cached
+            from renderFen2Img import render_fen
+            ok, png = cv2.imencode('.png', render_fen(fen))
+            if not ok:
+                return None, None
+            cached = ('"%s"' % hashlib.sha1(fen.encode()).hexdigest()[:16], png.tobytes())
+            self._boards[fen] = cached
+            if len(self._boards) > self.board_cache_size:
+                self._boards.popitem(last=False)
+        return cached
         
     def stop(self):
         """Stop camera capture"""
-        self.running = False
+        with self.new_frame:
+            self.running = False
+            self.new_frame.notify_all()
         if self.capture_thread:
             self.capture_thread.join()
-        print("[CAMERA STREAM] Stopped")
+        log.info("[CAMERA STREAM] Stopped")
 
 
 class StreamingHandler(BaseHTTPRequestHandler):
@@ -102,38 +394,103 @@ class StreamingHandler(BaseHTTPRequestHandler):
         self._set_cors_headers()
         self.end_headers()
     
+    def _send_part(self, frame_bytes):
+        """Write one multipart JPEG chunk"""
+        self.wfile.write(b"--jpgboundary\r\n")
+        self.wfile.write(b"Content-type: image/jpeg\r\n")
+        self.wfile.write(f"Content-length: {len(frame_bytes)}\r\n".encode())
+        self.wfile.write(b"\r\n")
+        self.wfile.write(frame_bytes)
+        self.wfile.write(b"\r\n")
+        BYTES_SENT.inc(len(frame_bytes))
+    
     def do_GET(self):
         """Handle GET requests"""
-        if self.path == '/' or self.path == '/stream':
+        url = urlparse(self.path)
+        if url.path == '/metrics':
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-type', metrics.CONTENT_TYPE)
+            self.send_header('Content-length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif url.path == '/board.png':
+            etag, png = self.camera_stream.get_board_png() if self.camera_stream else (None, None)
+            if png is None:
+                self.send_response(404)
+                self.end_headers()
+            elif self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self._set_cors_headers()
+                self.end_headers()
+            else:
+                self.send_response(200)
+                self.send_header('Content-type', 'image/png')
+                self.send_header('Content-length', str(len(png)))
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'no-cache')
+                self._set_cors_headers()
+                self.end_headers()
+                self.wfile.write(png)
+        elif url.path == '/annotated':
+            # Detection overlay, one part per detection cycle
+            self.send_response(200)
+            self.send_header('Content-type', 'multipart/x-mixed-replace; boundary=--jpgboundary')
+            self._set_cors_headers()
+            self.end_headers()
+            try:
+                seq, frame_bytes = self.camera_stream.get_annotated()
+                while self.camera_stream.running:
+                    if frame_bytes:
+                        self._send_part(frame_bytes)
+                    # Re-send the last overlay when idle, doubles as disconnect detection
+                    seq, frame_bytes = self.camera_stream.wait_annotated(seq, timeout=self.camera_stream.keepalive_interval)
+                    if frame_bytes is None:
+                        frame_bytes = (self.camera_stream.annotated or (0, None))[1]
+            except BrokenPipeError:
+                log.info("[CAMERA STREAM] Client disconnected")
+            except Exception as e:
+                log.warning("[CAMERA STREAM] Error: %s", e)
+        elif url.path == '/' or url.path == '/stream':
             # Both / and /stream return MJPEG stream directly
             self.send_response(200)
             self.send_header('Content-type', 'multipart/x-mixed-replace; boundary=--jpgboundary')
             self._set_cors_headers()
             self.end_headers()
             
+            res = parse_qs(url.query).get('res', ['mid'])[0]
+            CLIENTS.inc()
             try:
+                seq = 0
+                controller = None
                 while True:
-                    if self.camera_stream:
-                        frame_bytes = self.camera_stream.get_frame()
-                        if frame_bytes:
-                            self.wfile.write(b"--jpgboundary\r\n")
-                            self.wfile.write(b"Content-type: image/jpeg\r\n")
-                            self.wfile.write(f"Content-length: {len(frame_bytes)}\r\n".encode())
-                            self.wfile.write(b"\r\n")
-                            self.wfile.write(frame_bytes)
-                            self.wfile.write(b"\r\n")
-                    time.sleep(0.033)  # ~30fps
+                    if not self.camera_stream:
+                        time.sleep(0.1)
+                        continue
+                    if controller is None:
+                        controller = QualityController(res, self.camera_stream.fps)
+                    # Sleep until the capture thread publishes a newer frame
+                    rendition, quality = controller.key
+                    seq, frame_bytes = self.camera_stream.wait_frame(seq, rendition=rendition, quality=quality)
+                    if frame_bytes:
+                        start = time.monotonic()
+                        self._send_part(frame_bytes)
+                        controller.update(time.monotonic() - start)
             except BrokenPipeError:
-                print("[CAMERA STREAM] Client disconnected")
+                log.info("[CAMERA STREAM] Client disconnected")
             except Exception as e:
-                print(f"[CAMERA STREAM] Error: {e}")
+                log.warning("[CAMERA STREAM] Error: %s", e)
+            finally:
+                CLIENTS.dec()
         else:
             self.send_response(404)
             self.end_headers()
             
     def log_message(self, format, *args):
-        """Suppress default logging"""
-        pass
+        """Per-request access log, DEBUG level only"""
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("%s - %s", self.address_string(), format % args)
 
 
 class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
@@ -167,19 +524,254 @@ class MJPEGStreamServer:
         self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
         self.server_thread.start()
         
-        print(f"[MJPEG SERVER] Started on http://{self.host}:{self.port}")
-        print(f"[MJPEG SERVER] View stream at: http://localhost:{self.port}")
+        log.info("[MJPEG SERVER] Started on http://%s:%s", self.host, self.port)
+        log.info("[MJPEG SERVER] View stream at: http://localhost:%s", self.port)
         
     def stop(self):
         """Stop the streaming server"""
         if self.server:
             self.server.shutdown()
             self.server.server_close()
-        print("[MJPEG SERVER] Stopped")
+        log.info("[MJPEG SERVER] Stopped")
+
+
+class AsyncMJPEGStreamServer:
+    """
+    asyncio MJPEG streaming server
+    Serves all viewers from one event loop (on its own thread). Each client has a small
+    bounded queue: when a client is slower than the camera, its oldest queued frame is
+    dropped instead of blocking the broadcaster or the other clients.
+    """
+    
+    def __init__(self, camera_stream, host='0.0.0.0', port=8000, client_queue=2):
+        """
+        Initialize asyncio MJPEG server
+        
+        Args:
+            camera_stream: CameraStream instance
+            host: Server host (default: 0.0.0.0 - all interfaces)
+            port: Server port (default: 8000)
+            client_queue: Frames buffered per client before stale ones are dropped (default: 2)
+        """
+        self.camera_stream = camera_stream
+        self.host = host
+        self.port = port
+        self.client_queue = client_queue
+        self.clients = set()
+        self.latest = None
+        self.dropped = 0
+        self.loop = None
+        self.server = None
+        self.server_thread = None
+        self._started = threading.Event()
+        # /annotated: set and replaced once per detection cycle; the overlay of a cycle is
+        # drawn by one executor job shared by all clients
+        self._annotation_event = None
+        self._annotation_cycle = 0
+        self._annotated = None
+    
+    @staticmethod
+    def _part(jpeg):
+        """One multipart chunk as a list of buffers for a single vectored write"""
+        header = (b"--jpgboundary\r\nContent-type: image/jpeg\r\nContent-length: "
+                  + str(len(jpeg)).encode() + b"\r\n\r\n")
+        return [header, jpeg, b"\r\n"]
+    
+    def _on_frame(self, seq, jpeg):
+        """Capture-thread callback: hand the frame over to the event loop"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._broadcast, (seq, jpeg))
+    
+    def _on_annotation(self, seq):
+        """Detection-loop callback: wake the /annotated clients on the event loop"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._annotation_ready)
+    
+    def _annotation_ready(self):
+        self._annotated = None
+        self._annotation_cycle += 1
+        event, self._annotation_event = self._annotation_event, asyncio.Event()
+        event.set()
+    
+    def _annotated_frame(self):
+        """Future of (annotation_seq, jpeg) for the latest cycle, started on first use"""
+        if self._annotated is None:
+            self._annotated = self.loop.run_in_executor(None, self.camera_stream.get_annotated)
+        # Shielded: a disconnecting client must not cancel the draw the others wait for
+        return asyncio.shield(self._annotated)
+    
+    def _broadcast(self, item):
+        self.latest = item
+        for queue in self.clients:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+                FRAMES_DROPPED.inc()
+            queue.put_nowait(item)
+    
+    def _cors_headers(self):
+        return (b"Access-Control-Allow-Origin: *\r\n"
+                b"Access-Control-Allow-Methods: GET, HEAD, OPTIONS\r\n"
+                b"Access-Control-Allow-Headers: Content-Type\r\n"
+                b"Cross-Origin-Resource-Policy: cross-origin\r\n"
+                b"Cross-Origin-Embedder-Policy: unsafe-none\r\n")
+    
+    @staticmethod
+    def _header(request, name):
+        """Value of a request header (lower-case name), None when absent"""
+        for line in request.split(b"\r\n")[1:]:
+            key, sep, value = line.partition(b":")
+            if sep and key.strip().lower() == name:
+                return value.strip()
+        return None
+    
+    async def _handle(self, reader, writer):
+        queue = None
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10)
+            method, target = request.split(b" ", 2)[:2]
+            url = urlparse(target.decode("latin-1"))
+            path = url.path.encode()
+            res = parse_qs(url.query).get('res', ['mid'])[0]
+            loop = asyncio.get_running_loop()
+            
+            if method == b"OPTIONS":
+                writer.write(b"HTTP/1.0 200 OK\r\n" + self._cors_headers() + b"\r\n")
+                return
+            if path == b"/metrics":
+                body = metrics.render().encode()
+                writer.write(b"HTTP/1.0 200 OK\r\nContent-type: " + metrics.CONTENT_TYPE.encode() + b"\r\n"
+                             b"Content-length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+                return
+            if path == b"/board.png":
+                etag, png = await loop.run_in_executor(None, self.camera_stream.get_board_png)
+                if png is None:
+                    writer.write(b"HTTP/1.0 404 Not Found\r\n\r\n")
+                elif self._header(request, b"if-none-match") == etag.encode():
+                    writer.write(b"HTTP/1.0 304 Not Modified\r\nETag: " + etag.encode() + b"\r\n"
+                                 + self._cors_headers() + b"\r\n")
+                else:
+                    writer.write(b"HTTP/1.0 200 OK\r\nContent-type: image/png\r\n"
+                                 b"Content-length: " + str(len(png)).encode() + b"\r\n"
+                                 b"ETag: " + etag.encode() + b"\r\nCache-Control: no-cache\r\n"
+                                 + self._cors_headers() + b"\r\n")
+                    if method != b"HEAD":
+                        writer.write(png)
+                await writer.drain()
+                return
+            if path == b"/annotated":
+                writer.write(b"HTTP/1.0 200 OK\r\n"
+                             b"Content-type: multipart/x-mixed-replace; boundary=--jpgboundary\r\n"
+                             + self._cors_headers() + b"\r\n")
+                if method == b"HEAD":
+                    return
+                # Low-rate debug feed: clients wait on the loop, the overlay is drawn once per cycle
+                cycle = self._annotation_cycle
+                _, jpeg = await self._annotated_frame()
+                while self.camera_stream.running:
+                    if jpeg:
+                        writer.writelines(self._part(jpeg))
+                        await writer.drain()
+                    if cycle == self._annotation_cycle:
+                        try:
+                            await asyncio.wait_for(self._annotation_event.wait(), self.camera_stream.keepalive_interval)
+                        except asyncio.TimeoutError:
+                            # Keepalive: re-send the last overlay
+                            continue
+                    cycle = self._annotation_cycle
+                    _, latest = await self._annotated_frame()
+                    jpeg = latest or jpeg
+                return
+            if path not in (b"/", b"/stream"):
+                writer.write(b"HTTP/1.0 404 Not Found\r\n\r\n")
+                return
+            
+            writer.write(b"HTTP/1.0 200 OK\r\n"
+                         b"Content-type: multipart/x-mixed-replace; boundary=--jpgboundary\r\n"
+                         + self._cors_headers() + b"\r\n")
+            if method == b"HEAD":
+                return
+            
+            queue = asyncio.Queue(maxsize=self.client_queue)
+            if self.latest is not None:
+                queue.put_nowait(self.latest)
+            self.clients.add(queue)
+            CLIENTS.inc()
+            controller = QualityController(res, self.camera_stream.fps)
+            default_key = ("mid", self.camera_stream.jpeg_quality)
+            while True:
+                seq, jpeg = await queue.get()
+                if controller.key != default_key:
+                    # Shared per-frame encode of this client's rendition, off the event loop
+                    seq, jpeg = await loop.run_in_executor(None, self.camera_stream.get_encoded, *controller.key)
+                if not jpeg:
+                    continue
+                start = time.monotonic()
+                writer.writelines(self._part(jpeg))
+                await writer.drain()
+                BYTES_SENT.inc(len(jpeg))
+                controller.update(time.monotonic() - start)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.LimitOverrunError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # Server shutting down; finish quietly so the stream protocol does not log the cancel
+            pass
+        except (ConnectionResetError, BrokenPipeError):
+            log.info("[CAMERA STREAM] Client disconnected")
+        except Exception as e:
+            log.warning("[CAMERA STREAM] Error: %s", e)
+        finally:
+            if queue is not None:
+                self.clients.discard(queue)
+                CLIENTS.dec()
+            try:
+                writer.close()
+            except Exception:
+                pass
+    
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._annotation_event = asyncio.Event()
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, backlog=512))
+        self._started.set()
+        self.loop.run_forever()
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+    
+    def start(self):
+        """Start the streaming server"""
+        self.camera_stream.listeners.append(self._on_frame)
+        self.camera_stream.annotation_listeners.append(self._on_annotation)
+        self.server_thread = threading.Thread(target=self._run, daemon=True)
+        self.server_thread.start()
+        self._started.wait()
+        
+        log.info("[MJPEG SERVER] Started (asyncio) on http://%s:%s", self.host, self.port)
+        log.info("[MJPEG SERVER] View stream at: http://localhost:%s", self.port)
+        
+    def stop(self):
+        """Stop the streaming server"""
+        if self._on_frame in self.camera_stream.listeners:
+            self.camera_stream.listeners.remove(self._on_frame)
+        if self._on_annotation in self.camera_stream.annotation_listeners:
+            self.camera_stream.annotation_listeners.remove(self._on_annotation)
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.server_thread.join()
+        log.info("[MJPEG SERVER] Stopped")
 
 
 # Example usage
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     # Create camera stream with low resolution for smooth streaming
     camera_stream = CameraStream(camera_index=0, width=640, height=480, fps=30)
     camera_stream.start_capture()
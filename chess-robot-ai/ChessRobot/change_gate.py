@@ -0,0 +1,160 @@
+"""
+Per-square change gating and motion-gated detection cascade
+Compares each of the 64 warped board squares against the previous frame and the last stable
+reference so the expensive hand/piece models only run when the board changed and then settled.
+Board quads are in the coordinates of the frame being observed (FEN.boardQuad), not the raw
+camera cornersH.
+"""
+import time
+
+import cv2
+import numpy as np
+
+from typing import Optional
+
+from board_roi import BoardWarp
+
+
+class SquareChangeGate():
+    """Stage 1 of DetectionCascade, which owns the run/skip decision and its counters"""
+
+    def __init__(self, cell_px: int = 16, threshold: float = 10.0, refresh_interval: float = 5.0):
+        """
+        Args:
+            cell_px: Pixels per square on the warped grayscale board (cell mean = box filter)
+            threshold: Mean absolute gray-level difference for a square to count as changed
+            refresh_interval: Force a detection after this many seconds even without change
+        """
+        self.cell_px = cell_px
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self.warp = BoardWarp(size=8 * cell_px, margin=0.0)
+
+        self.reference: Optional[np.ndarray] = None
+        self.previous: Optional[np.ndarray] = None
+        self.pending: Optional[np.ndarray] = None
+        self.last_run = 0.0
+
+        self.changed = np.zeros((8, 8), dtype=bool)
+        self.motion = np.zeros((8, 8), dtype=bool)
+
+    def squares(self, frame: np.ndarray, quad: np.ndarray) -> np.ndarray:
+        """(8, 8) mean gray level of every board square"""
+        board = self.warp.warp(frame, quad)
+        gray = cv2.cvtColor(board, cv2.COLOR_BGR2GRAY) if board.ndim == 3 else board
+        c = self.cell_px
+        return gray.reshape(8, c, 8, c).mean(axis=(1, 3), dtype=np.float32)
+
+    def cellDiff(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        return np.abs(a - b) > self.threshold
+
+    def observe(self, frame: np.ndarray, quad: np.ndarray) -> np.ndarray:
+        """Update per-square motion (vs previous frame) and change (vs reference) masks"""
+        cells = self.squares(frame, quad)
+        prev, self.previous = self.previous, cells
+
+        self.motion = self.cellDiff(cells, prev) if prev is not None else np.ones((8, 8), dtype=bool)
+        if self.reference is not None:
+            self.changed = self.cellDiff(cells, self.reference)
+        return cells
+
+    def refreshDue(self) -> bool:
+        return time.monotonic() - self.last_run > self.refresh_interval
+
+    def markRun(self, cells: np.ndarray):
+        self.pending = cells
+        self.last_run = time.monotonic()
+
+    def commit(self):
+        """Accept the last frame passed to detection as the new stable reference"""
+        if self.pending is not None:
+            self.reference = self.pending
+            self.pending = None
+            self.changed[:] = False
+
+    def reset(self):
+        self.reference = None
+        self.previous = None
+        self.pending = None
+
+
+class DetectionCascade():
+    """Motion -> hand -> piece cascade used by FEN.getFEN
+
+    Stage 1: per-square motion/change estimate over the board region (SquareChangeGate).
+    Stage 2: the hand model, only while motion is present (and once more before stage 3
+             if a hand was seen during the last motion period).
+    Stage 3: the piece model, only after the board has been still for settle_time seconds
+             and differs from the last stable board (or a refresh is due).
+    """
+
+    def __init__(self, settle_time: float = 0.4, gate: Optional[SquareChangeGate] = None):
+        self.settle_time = settle_time
+        self.gate = gate or SquareChangeGate()
+        self.last_motion = 0.0
+        self.hand_seen = False
+        self.counters = {
+            "frames": 0,
+            "motion": 0,        # stage 1 saw motion, hand model ran
+            "static": 0,        # stage 1: still and unchanged since the last stable board
+            "settling": 0,      # still, but not for settle_time yet
+            "hand": 0,          # stage 2 found a hand
+            "piece": 0,         # stage 3 ran
+        }
+
+    def step(self, frame: np.ndarray, cornersH, hand, quad: np.ndarray) -> bool:
+        """
+        Return True when the piece model should run on this frame
+        
+        Args:
+            cornersH: Corners as found by getCorners, passed to the hand model unchanged
+            quad: Validated board quad in frame coordinates, used by the change gate
+        """
+        c = self.counters
+        c["frames"] += 1
+        gate = self.gate
+        cells = gate.observe(frame, quad)
+        now = time.monotonic()
+
+        if gate.motion.any():
+            self.last_motion = now
+            c["motion"] += 1
+            if hand.detectHand(frame, cornersH):
+                self.hand_seen = True
+                c["hand"] += 1
+            return False
+
+        if gate.reference is not None and not gate.changed.any() and not gate.refreshDue():
+            c["static"] += 1
+            return False
+
+        if now - self.last_motion < self.settle_time:
+            c["settling"] += 1
+            return False
+
+        if self.hand_seen or gate.reference is None:
+            # A hand can rest on the board without moving
+            if hand.detectHand(frame, cornersH):
+                self.hand_seen = True
+                c["hand"] += 1
+                return False
+            self.hand_seen = False
+
+        gate.markRun(cells)
+        c["piece"] += 1
+        return True
+
+    def commit(self):
+        self.gate.commit()
+
+    def reset(self):
+        self.gate.reset()
+        self.hand_seen = False
+        self.last_motion = 0.0
+
+    def stats(self) -> str:
+        c = self.counters
+        frames = max(1, c["frames"])
+        filtered = c["frames"] - c["piece"]
+        return (f"frames={c['frames']} motion={c['motion']} static={c['static']} settling={c['settling']} "
+                f"hand={c['hand']} piece={c['piece']} filtered={filtered / frames:.1%}")
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import os
 import cv2
+import logging
 import numpy as np
 import re
 import asyncio
@@ -11,19 +12,56 @@ import chess.engine
 from pathlib import Path
 import json
 import threading
+import time
 from typing import Any, Dict, List, Tuple, Optional
 
-from ultralytics import YOLO
-
-from corners import Corner
 from piece import Piece
-from hand import Hand
 from fen import FEN
 from network.socket_client import TCPClient
-from renderFen2Img import render_fen
-from camera_stream import CameraStream, MJPEGStreamServer
-
-async def getCorners(cam, corner, status=None, timeout=30):
+from camera_stream import CameraStream, MJPEGStreamServer, AsyncMJPEGStreamServer
+from backends import resolveModelPath
+from debug_viewer import DebugViewer
+from frame_hub import FrameHub
+import metrics
+from logs import setupLogging
+
+# Fixed name: this module usually runs as __main__
+log = logging.getLogger("chessrobotAI")
+
+HAND_SECONDS = metrics.histogram("hand_detect_seconds", "Hand.detectHand latency")
+
+# Run the piece model on the warped board region only (see board_roi.BoardWarp)
+ROI_INFERENCE = os.environ.get("CHESSROBOT_ROI_INFERENCE", "0") == "1"
+# Debug: compare Detections.assignCells with ChessMapper on every detection frame (costs a second mapping)
+CHECK_CELLS = os.environ.get("CHESSROBOT_CHECK_CELLS", "0") == "1"
+# Model variant: "fp32" (models/*.pt) or "int8" (models/*_int8.onnx from quantize_models.py)
+MODEL_VARIANT = os.environ.get("CHESSROBOT_MODEL_VARIANT", "fp32")
+# Debug windows (frame, detections, rendered board); production boards run headless
+DEBUG_VIEW = os.environ.get("CHESSROBOT_DEBUG_VIEW", "0") == "1"
+# Serve the MJPEG stream from one asyncio loop instead of one thread per viewer
+ASYNC_STREAM = os.environ.get("CHESSROBOT_ASYNC_STREAM", "0") == "1"
+# Run the piece model in a worker process fed through shared memory (see detection_worker)
+DETECT_PROCESS = os.environ.get("CHESSROBOT_DETECT_PROCESS", "0") == "1"
+# Drive the pipeline from a recording.py container instead of the camera; "realtime" or "fast" pacing
+REPLAY = os.environ.get("CHESSROBOT_REPLAY")
+REPLAY_MODE = os.environ.get("CHESSROBOT_REPLAY_MODE", "realtime")
+# Record the raw camera frames of this session into a recording.py container
+RECORD = os.environ.get("CHESSROBOT_RECORD")
+RECORD_FRAMES = int(os.environ.get("CHESSROBOT_RECORD_FRAMES", "3000"))
+# Stockfish UCI Threads / Hash (MB); unset keeps FEN's defaults (half the cores, 64 MB)
+ENGINE_THREADS = os.environ.get("CHESSROBOT_ENGINE_THREADS")
+ENGINE_HASH = os.environ.get("CHESSROBOT_ENGINE_HASH")
+# Always-on ring of recent frames/detections/decisions, dumped on illegal_move, game_over or request
+BLACKBOX = os.environ.get("CHESSROBOT_BLACKBOX", "1") == "1"
+
+def quitRequested(viewer):
+    return viewer is not None and viewer.takeQuit()
+
+def closeWindows(viewer):
+    if viewer is not None:
+        viewer.clear()
+
+async def getCorners(cam, corner, status=None, timeout=30, viewer=None):
     """Get corners with timeout and state checking"""
     cornersH = None
     start_time = asyncio.get_event_loop().time()
@@ -31,13 +69,13 @@ async def getCorners(cam, corner, status=None, timeout=30):
     while True:
         # Check if game was cancelled
         if status and status.get("state") == "end":
-            print("[INFO] Corner detection cancelled - game ended")
-            cv2.destroyAllWindows()
+            log.info("Corner detection cancelled - game ended")
+            closeWindows(viewer)
             return None
             
         # Check timeout
         if asyncio.get_event_loop().time() - start_time > timeout:
-            print("[WARNING] Corner detection timeout")
+            log.warning("Corner detection timeout")
             return None
             
         ok, frame = cam.read()
@@ -47,7 +85,7 @@ async def getCorners(cam, corner, status=None, timeout=30):
             
         cornersH = corner.getCorners(frame, 2)
         if cornersH is not None:
-            print("Corners found:", cornersH)
+            log.info("Corners found: %s", cornersH)
             return cornersH
             
         # Yield control to allow other tasks to run
@@ -55,60 +93,22 @@ async def getCorners(cam, corner, status=None, timeout=30):
     
     return cornersH
 
-def sendOutput(fen, stockfish):
-    fen_str = fen.FEN_last
-    isCheck = fen.isCheck
-    isCheckmate = fen.isCheckmate
-    isStalemate = fen.isStalemate
-    isGameover = fen.isGameover
-
-    board = chess.Board(fen.FEN_last)
-    limit = chess.engine.Limit(time=0.1)
-    result = stockfish.analyse(board, limit)
-
-    bestmove = result["pv"][0]
-    
-    # Determine move type
-    if board.is_castling(bestmove):
-        mv_type = "castle"
-    elif board.is_capture(bestmove) or board.is_en_passant(bestmove):
-        mv_type = "attack"
-    else:
-        mv_type = "move"
-    
-    from_sq, to_sq = bestmove.from_square, bestmove.to_square
-    from_piece = board.piece_at(from_sq)
-    to_piece = board.piece_at(to_sq)
-    san = board.san(bestmove)
-
-    # Make the move to get the updated position
-    board.push(bestmove)
-    results_in_check = board.is_check()
-    
-    def piece_label(p):
-        if p is None:
-            return None
-        color = "white" if p.color == chess.WHITE else "black"
-        names = {1: "pawn", 2: "knight", 3: "bishop", 4: "rook", 5: "queen", 6: "king"}
-        return f"{color}_{names[p.piece_type]}"
-    
-    return {
-        "fen_str": fen_str,
-        "move": {
-            "type": mv_type,
-            "from": chess.square_name(from_sq),
-            "to": chess.square_name(to_sq),
-            "from_piece": piece_label(from_piece),
-            "to_piece": piece_label(to_piece),
-            "notation": san,
-            "results_in_check": results_in_check
-        }
-    }
+async def untilEnded(coro, status, poll=0.02):
+    """Run coro unless the game ends first; returns False when it was cancelled by an "end" command"""
+    task = asyncio.ensure_future(coro)
+    while not task.done():
+        if status and status.get("state") == "end":
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return False
+        await asyncio.wait({task}, timeout=poll)
+    task.result()
+    return True
 
 async def receiveStatus(tcp_client, status):
     while True:
         msg = await tcp_client.receive()
-        print("raw msg:", msg)
+        log.debug("raw msg: %s", msg)
 
         if not msg:
             await asyncio.sleep(0.1)
@@ -138,259 +138,375 @@ async def receiveStatus(tcp_client, status):
                     status["state"] = st
                     if st == "end":
                         # For end command, just update state - don't update other fields
-                        print(f"[RECEIVE] End command received for game: {game_id}")
+                        log.info("[RECEIVE] End command received for game: %s", game_id)
                     else:
                         # For start/resume, update all fields
                         status["game_id"] = game_id
                         status["difficulty"] = difficulty
                         status["game_type"] = game_type
                         status["puzzle_fen"] = puzzle_fen
-                        print(f"updated state: {status['state']}, game_id: {game_id}, difficulty: {difficulty}, game_type: {game_type}")
+                        log.info("updated state: %s, game_id: %s, difficulty: %s, game_type: %s", status['state'], game_id, difficulty, game_type)
                         if puzzle_fen:
-                            print(f"Puzzle FEN: {puzzle_fen}")
+                            log.info("Puzzle FEN: %s", puzzle_fen)
+            
+            elif command == "dump_blackbox":
+                status["dump_blackbox"] = payload.get("reason", "manual")
+                log.info("Received black-box dump request")
             
             elif command == "verify_board_setup":
                 game_id = payload.get("game_id")
                 status["verify_board"] = game_id
-                print(f"Received verify board setup request for game: {game_id}")
+                log.info("Received verify board setup request for game: %s", game_id)
 
     return
 
-async def playChess(cam, cornersH, hand, piece, fen, stockfish, tcp_client, game_id=None, difficulty="medium", game_type="normal_game", puzzle_fen=None, status=None):
+async def playChess(cam, cornersH, hand, piece, fen, stockfish, tcp_client, game_id=None, difficulty="medium", game_type="normal_game", puzzle_fen=None, status=None, viewer=None, stream=None):
     # Load FEN from saved state (resume) or puzzle, otherwise use initial position
     if puzzle_fen:
         fen.FEN_last = puzzle_fen
         if game_type == "training_puzzle":
-            print(f"[PUZZLE MODE] Starting with FEN: {puzzle_fen}")
+            log.info("[PUZZLE MODE] Starting with FEN: %s", puzzle_fen)
         else:
-            print(f"[RESUME] Loading saved FEN: {puzzle_fen}")
+            log.info("[RESUME] Loading saved FEN: %s", puzzle_fen)
     else:
         # Reset to standard starting position for new game
         fen.FEN_last = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
-        print("[NEW GAME] Reset FEN to initial position")
-    
-    # Reset game state flags
-    fen.isCheck = False
-    fen.isCheckmate = False
-    fen.isStalemate = False
-    fen.isGameover = False
+        log.info("[NEW GAME] Reset FEN to initial position")
     
     # Set AI difficulty before starting game
     fen.set_difficulty(difficulty)
     
     board_setup_correct = False
+    # Motion-gated hand/piece inference, starting from an empty reference
+    fen.cascade.reset()
+    fen.evidence.reset()
+    if stream is not None:
+        stream.publish_fen(fen.FEN_last)
+    seen_detections = fen.last_detections
     
     while True:
         # Check if game should end
         if status and status.get("state") == "end":
-            print("[INFO] Game ended - stopping detection")
+            log.info("Game ended - stopping detection")
             break
+        if status and status.get("dump_blackbox"):
+            await fen.dump_blackbox(status.pop("dump_blackbox"), game_id)
             
         ok, frame = cam.read()
         if not ok:
             await asyncio.sleep(0.1)
             continue
             
-        # Process Frame
         frame = piece.processFrame(frame)
-        # frame = cv2.rotate(frame, cv2.ROTATE_180)
-        cv2.imshow("Chess Stream", frame)
 
-        # Get FEN new
-        FEN_new = fen.getFEN(frame, cornersH, hand, piece)
+        # Get FEN new (None while moving, settling, a hand is over the board or nothing changed)
+        # Off the event loop so TCP commands are handled while the models run
+        FEN_new = await asyncio.to_thread(fen.getFEN, frame, cornersH, hand, piece, gated=True)
+        # Detections of this cycle when the piece model ran, whether or not fusion produced a FEN
+        detections = fen.last_detections if fen.last_detections is not seen_detections else None
+        seen_detections = fen.last_detections
+        if fen.blackbox is not None:
+            fen.blackbox.record(frame, detections, FEN_new)
+        if viewer is not None:
+            viewer.publish(frame=frame, detections=detections, warp=fen.last_warp)
+        if stream is not None and detections is not None:
+            # Drawn lazily, only when someone watches /annotated
+            stream.publish_detections(frame, detections, piece.visualizePieces, warp=fen.last_warp)
         if FEN_new is None:
-            await asyncio.sleep(0.05)
+            if quitRequested(viewer):
+                break
+            await asyncio.sleep(0.03)
             continue
-        
-        # Render current board state (even if setup not correct)
-        renderFen = render_fen(FEN_new)
-        cv2.imshow("Chess board", renderFen)
+
+        # Show current board state (even if setup not correct)
+        if viewer is not None:
+            viewer.publish(fen=FEN_new)
         
         # Keep checking board setup until correct
         if not board_setup_correct:
             is_correct = await fen.check_and_send_board_status(tcp_client, FEN_new, game_id)
             if is_correct:
                 board_setup_correct = True
-                print("[INFO] Board setup verified as correct - starting game")
+                log.info("Board setup verified as correct - starting game")
             else:
                 # Wait a bit before checking again
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+                if quitRequested(viewer):
                     await tcp_client.close()
                     break
                 await asyncio.sleep(0.5)
             continue
         
-        await fen.updateFEN(FEN_new, stockfish, tcp_client, game_id=game_id, check_setup=False)
-        renderFen = render_fen(fen.FEN_last)
+        # Stockfish runs inside updateFEN; an "end" command cancels it instead of waiting for the search
+        if not await untilEnded(fen.updateFEN(FEN_new, stockfish, tcp_client, game_id=game_id, check_setup=False), status):
+            log.info("Game ended during engine search - search cancelled")
+            break
 
         # Check for end state again after move processing
         if status and status.get("state") == "end":
-            print("[INFO] Game ended during move processing - stopping detection")
+            log.info("Game ended during move processing - stopping detection")
             break
 
         if fen.isCheck:
-            print("[CHECK] Check detected")
+            log.info("[CHECK] Check detected")
             # Send check notification
             await fen.send_check_notification(tcp_client, game_id)
         
         # Check for game over conditions
         if fen.isCheckmate:
-            print("[GAME OVER] Checkmate detected")
+            log.info("[GAME OVER] Checkmate detected")
             await fen.send_game_over_notification(tcp_client, game_id)
             break
         if fen.isStalemate:
-            print("[GAME OVER] Stalemate detected")
+            log.info("[GAME OVER] Stalemate detected")
             await fen.send_game_over_notification(tcp_client, game_id)
             break
         if fen.isGameover:
-            print("[GAME OVER] Game over detected")
+            log.info("[GAME OVER] Game over detected")
             await fen.send_game_over_notification(tcp_client, game_id)
             break
 
         if fen.side == "w":
-            print("Robot moves")
+            log.debug("Robot moves")
         else:
-            print("Human moves")
+            log.debug("Human moves")
 
-        cv2.imshow("Chess board", renderFen)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+        if viewer is not None:
+            viewer.publish(fen=fen.FEN_last)
+        if stream is not None:
+            stream.publish_fen(fen.FEN_last)
+        if quitRequested(viewer):
             break
             
         # Yield control to allow receiving new messages
         await asyncio.sleep(0.01)
     
+    log.info("[CASCADE] %s", fen.cascade.stats())
     # Cleanup: close all OpenCV windows
-    cv2.destroyAllWindows()
-    print("[INFO] Exiting playChess - game ended, windows closed")
+    closeWindows(viewer)
+    log.info("Exiting playChess - game ended, windows closed")
     return
 
-async def main():
-    piece = Piece("models/modelPiece.pt")
-    hand = Hand("models/modelHand.pt")
+def loadPiece():
+    if DETECT_PROCESS:
+        from detection_worker import RemotePiece
+        # Slots sized for the largest camera mode we run
+        return RemotePiece("models/modelPiece.pt", shape=(1080, 1920, 3), variant=MODEL_VARIANT)
+    return Piece("models/modelPiece.pt", variant=MODEL_VARIANT)
+
+def loadHand():
+    # Imported lazily: hand.py pulls in ultralytics/torch
+    from hand import Hand
+    hand = Hand(resolveModelPath("models/modelHand.pt", MODEL_VARIANT))
+    # hand.py is not ours to edit; time detectHand on the instance instead
+    hand.detectHand = HAND_SECONDS.time()(hand.detectHand)
+    return hand
+
+def loadCorner():
+    from corners import Corner
     # size chuẩn 640, 480
     # rate = 640 / width
-    corner = Corner("models/modelCorner.pt", 1)
+    return Corner(resolveModelPath("models/modelCorner.pt", MODEL_VARIANT), 1)
+
+def openCamera():
+    if REPLAY:
+        from recording import ReplaySource
+        log.info("[REPLAY] %s (%s)", REPLAY, REPLAY_MODE)
+        return ReplaySource(REPLAY, realtime=REPLAY_MODE != "fast")
+    cam = cv2.VideoCapture(0)
+    if RECORD:
+        from recording import FrameRecorder, RecordingCapture
+        cam = RecordingCapture(cam, FrameRecorder(RECORD, RECORD_FRAMES))
+    return cam
+
+def warmupModel(obj, shape=(480, 640, 3)):
+    """Run one inference on a dummy frame so the first real frame does not pay the warm-up cost"""
+    dummy = np.zeros(shape, dtype=np.uint8)
+    if hasattr(obj, "warmup"):
+        obj.warmup(dummy)
+        return
+    model = getattr(obj, "model", None)
+    if callable(model):
+        model(dummy, verbose=False)
+
+async def timed(timings, name, coro):
+    start = time.perf_counter()
+    result = await coro
+    timings[name] = time.perf_counter() - start
+    return result
+
+def loadAndWarmup(loader):
+    obj = loader()
+    warmup_start = time.perf_counter()
+    warmupModel(obj)
+    return obj, time.perf_counter() - warmup_start
+
+async def main():
+    startup = time.perf_counter()
+    timings = {}
 
     # 1 - Human cầm White đi trước
     # 2 - Human cầm White đi sau
     # 3 - Human cầm Black đi sau
     # 4 - Human cầm Black đi trước
     fen = FEN(1)
+    fen.check_cells = CHECK_CELLS
+    if ENGINE_THREADS or ENGINE_HASH:
+        fen.setEngineOptions(threads=int(ENGINE_THREADS) if ENGINE_THREADS else None,
+                             hash_mb=int(ENGINE_HASH) if ENGINE_HASH else None)
+    if ROI_INFERENCE:
+        fen.enableRoiInference()
+    if BLACKBOX:
+        from blackbox import BlackBox
+        fen.blackbox = BlackBox()
 
     engine_path = "/usr/games/stockfish"
-    stockfish = chess.engine.SimpleEngine.popen_uci(engine_path)
-
     tcp_client = TCPClient(host="10.17.0.187", port=8080)
-    await tcp_client.connect()
 
+    # Models, Stockfish, camera and the server connection are independent - bring them up together
+    (piece, piece_wu), (hand, hand_wu), (corner, corner_wu), (_, stockfish), cam, _ = await asyncio.gather(
+        timed(timings, "piece model", asyncio.to_thread(loadAndWarmup, loadPiece)),
+        timed(timings, "hand model", asyncio.to_thread(loadAndWarmup, loadHand)),
+        timed(timings, "corner model", asyncio.to_thread(loadAndWarmup, loadCorner)),
+        timed(timings, "stockfish", chess.engine.popen_uci(engine_path)),
+        timed(timings, "camera", asyncio.to_thread(openCamera)),
+        timed(timings, "tcp connect", tcp_client.connect()),
+    )
+    timings["  piece warm-up"] = piece_wu
+    timings["  hand warm-up"] = hand_wu
+    timings["  corner warm-up"] = corner_wu
+
+    # Only announce ourselves once every model is loaded and warm
     ai_identity = {
        "type": "ai_identify",
        "ai_id": "chess_vision_ai"
     }
     await tcp_client.send(json.dumps(ai_identity) + "\n")    
-    print("AI identified with server:", ai_identity)
+    log.info("AI identified with server: %s", ai_identity)
 
-    cam = cv2.VideoCapture(0)
-    #cam = cv2.VideoCapture("test/video1.mp4")
+    timings["total"] = time.perf_counter() - startup
+    log.info("[STARTUP] Timing breakdown (loads run concurrently):")
+    for name, seconds in timings.items():
+        log.info("[STARTUP]   %-18s %8.1f ms", name, seconds * 1000)
     
+    viewer = DebugViewer(piece).start() if DEBUG_VIEW else None
+
     # Start camera streaming server (low resolution for smooth streaming)
     camera_stream = CameraStream(camera_index=0, width=480, height=360, fps=25)
-    camera_stream.start_capture(cam=cam)
+    if REPLAY and REPLAY_MODE == "fast":
+        # Latest-frame readers would skip frames at full speed: the pipeline reads the recording
+        # itself, every frame once and in order, and the stream shows what it read
+        hub = FrameHub().start()
+        corner_cam = detect_cam = hub.tap(cam)
+    else:
+        # One capture thread feeds streaming, corner finding and detection
+        hub = FrameHub(cam).start()
+        corner_cam = hub.reader("corners")
+        detect_cam = hub.reader("detection")
+    camera_stream.start_capture(cam=hub.reader("stream"))
     
-    stream_server = MJPEGStreamServer(camera_stream, host='0.0.0.0', port=8000)
+    server_cls = AsyncMJPEGStreamServer if ASYNC_STREAM else MJPEGStreamServer
+    stream_server = server_cls(camera_stream, host='0.0.0.0', port=8000)
     stream_server.start()
-    print("[INFO] Camera stream available at http://10.17.0.187:8000")
+    log.info("Camera stream available at http://10.17.0.187:8000")
     
     status = {"state": "waiting", "difficulty": "medium", "game_type": "normal_game", "puzzle_fen": None}  # default: waiting for start command
 
     recv_task = asyncio.create_task(receiveStatus(tcp_client, status))
 
-    # # wait until server sends "start" or "end"
-    while True:
-        current = status.get("state")
-        verify_game_id = status.get("verify_board")
-        difficulty = status.get("difficulty", "medium")
-        print(f"current state: {current}, difficulty: {difficulty}")
-
-        # Handle verify board setup request
-        if verify_game_id:
-            print(f"Verifying board setup for game: {verify_game_id}")
-            ok, frame = cam.read()
-            if ok:
-                frame = piece.processFrame(frame)
-                # Get current corners if not already set
-                if 'cornersH' not in locals() or cornersH is None:
-                    cornersH = await getCorners(cam, corner, status=status, timeout=10)
+    try:
+        # # wait until server sends "start" or "end"
+        while True:
+            current = status.get("state")
+            verify_game_id = status.get("verify_board")
+            difficulty = status.get("difficulty", "medium")
+            log.debug("current state: %s, difficulty: %s", current, difficulty)
+
+            if status.get("dump_blackbox"):
+                await fen.dump_blackbox(status.pop("dump_blackbox"), status.get("game_id"))
+
+            # Handle verify board setup request
+            if verify_game_id:
+                log.info("Verifying board setup for game: %s", verify_game_id)
+                ok, frame = detect_cam.read()
+                if ok:
+                    frame = piece.processFrame(frame)
+                    # Get current corners if not already set
+                    if 'cornersH' not in locals() or cornersH is None:
+                        cornersH = await getCorners(corner_cam, corner, status=status, timeout=10, viewer=viewer)
                 
-                if cornersH is not None:
-                    FEN_new = fen.getFEN(frame, cornersH, hand, piece)
-                    if FEN_new:
-                        await fen.send_board_setup_status(tcp_client, FEN_new, game_id=verify_game_id)
+                    if cornersH is not None:
+                        FEN_new = fen.getFEN(frame, cornersH, hand, piece)
+                        if FEN_new:
+                            await fen.send_board_setup_status(tcp_client, FEN_new, game_id=verify_game_id)
             
-            # Clear verify request
-            status["verify_board"] = None
-
-        if current == "end":
-            print("[INFO] Received end command - resetting to waiting state")
-            # Close all OpenCV windows and reset status
-            cv2.destroyAllWindows()
-            # Reset FEN to initial position
-            fen.FEN_last = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
-            fen.isCheck = False
-            fen.isCheckmate = False
-            fen.isStalemate = False
-            fen.isGameover = False
-            status["state"] = "waiting"
-            status["game_id"] = None
-            status["difficulty"] = "medium"
-            status["game_type"] = "normal_game"
-            status["puzzle_fen"] = None
-            print("[INFO] AI is now in waiting state, ready for next game")
-            await asyncio.sleep(0.5)
-            continue
-
-        if current in ("start", "resume"):
-            ##### Get Corners (reuse existing corners for resume if available)
-            if current == "resume" and 'cornersH' in locals() and cornersH is not None:
-                print("[INFO] Reusing existing corners for resume")
-            else:
-                cornersH = await getCorners(cam, corner, status=status, timeout=30)
+                # Clear verify request
+                status["verify_board"] = None
+
+            if current == "end":
+                log.info("Received end command - resetting to waiting state")
+                # Close all OpenCV windows and reset status
+                closeWindows(viewer)
+                # Reset FEN to initial position
+                fen.FEN_last = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+                status["state"] = "waiting"
+                status["game_id"] = None
+                status["difficulty"] = "medium"
+                status["game_type"] = "normal_game"
+                status["puzzle_fen"] = None
+                log.info("AI is now in waiting state, ready for next game")
+                await asyncio.sleep(0.5)
+                continue
+
+            if current in ("start", "resume"):
+                ##### Get Corners (reuse existing corners for resume if available)
+                if current == "resume" and 'cornersH' in locals() and cornersH is not None:
+                    log.info("Reusing existing corners for resume")
+                else:
+                    cornersH = await getCorners(corner_cam, corner, status=status, timeout=30, viewer=viewer)
                 
-                # Check if corner detection was cancelled or timed out
-                if cornersH is None:
-                    print("[INFO] Corner detection failed or cancelled - returning to waiting state")
-                    cv2.destroyAllWindows()
-                    status["state"] = "waiting"
-                    status["game_id"] = None
-                    continue
-
-            ##### Play Chess
-            game_id = status.get("game_id")
-            difficulty = status.get("difficulty", "medium")
-            game_type = status.get("game_type", "normal_game")
-            puzzle_fen = status.get("puzzle_fen")
+                    # Check if corner detection was cancelled or timed out
+                    if cornersH is None:
+                        log.info("Corner detection failed or cancelled - returning to waiting state")
+                        closeWindows(viewer)
+                        status["state"] = "waiting"
+                        status["game_id"] = None
+                        continue
+
+                ##### Play Chess
+                game_id = status.get("game_id")
+                difficulty = status.get("difficulty", "medium")
+                game_type = status.get("game_type", "normal_game")
+                puzzle_fen = status.get("puzzle_fen")
             
-            # Pass status to playChess so it can check for end state
-            await playChess(cam, cornersH, hand, piece, fen, stockfish, tcp_client, 
-                          game_id=game_id, difficulty=difficulty, game_type=game_type, 
-                          puzzle_fen=puzzle_fen, status=status)
+                # Pass status to playChess so it can check for end state
+                await playChess(detect_cam, cornersH, hand, piece, fen, stockfish, tcp_client, 
+                              game_id=game_id, difficulty=difficulty, game_type=game_type, 
+                              puzzle_fen=puzzle_fen, status=status, viewer=viewer, stream=camera_stream)
             
-            # After playChess ends, reset to waiting state
-            print("[INFO] Game finished - returning to waiting state")
-            cv2.destroyAllWindows()
-            # Reset FEN to initial position
-            fen.FEN_last = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
-            fen.isCheck = False
-            fen.isCheckmate = False
-            fen.isStalemate = False
-            fen.isGameover = False
-            status["state"] = "waiting"
-            status["game_id"] = None
-            continue
+                # After playChess ends, reset to waiting state
+                log.info("Game finished - returning to waiting state")
+                log.info("[FRAME HUB] %s", hub.stats())
+                closeWindows(viewer)
+                # Reset FEN to initial position
+                fen.FEN_last = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+                status["state"] = "waiting"
+                status["game_id"] = None
+                continue
             
-        await asyncio.sleep(0.1)
+            await asyncio.sleep(0.1)
+    finally:
+        recv_task.cancel()
+        stream_server.stop()
+        camera_stream.stop()
+        hub.stop()
+        # Closes the recorder of a RecordingCapture, so an interrupted session is flushed too
+        cam.release()
+        if hasattr(piece, "close"):
+            piece.close()
+        await stockfish.quit()
 
 
 if __name__ == "__main__":
+    setupLogging()
     asyncio.run(main())
 
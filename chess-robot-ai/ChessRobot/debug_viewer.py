@@ -0,0 +1,106 @@
+"""
+Optional debug viewer
+The detection loop hands its latest frame, detections and FEN to a single-slot mailbox
+(newer data overwrites older, nothing is copied or drawn on the caller's side). A separate
+thread redraws the OpenCV windows at its own capped rate. Production runs headless and
+never creates one.
+"""
+import logging
+import threading
+import time
+
+import cv2
+
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+
+class DebugViewer():
+    def __init__(self, piece, max_fps: float = 10.0):
+        """
+        Args:
+            piece: Piece instance, used for visualizePieces
+            max_fps: Upper bound on the redraw rate
+        """
+        self.piece = piece
+        self.interval = 1.0 / max_fps
+        self.lock = threading.Lock()
+        self.slot: Optional[dict] = None
+        self.clear_requested = False
+        self.quit_requested = False
+        self.running = False
+        self.thread = None
+        self._board_fen = None
+        self._board_img = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        log.info("[DEBUG VIEWER] Started (max %.0f fps)", 1.0 / self.interval)
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+
+    def publish(self, frame=None, detections=None, fen: Optional[str] = None, warp=None):
+        """Replace the mailbox content; fields left as None keep their previous value"""
+        with self.lock:
+            slot = self.slot or {}
+            if frame is not None:
+                slot["frame"] = frame
+                slot["warp"] = warp
+            if detections is not None:
+                slot["detections"] = detections
+                slot["det_frame"] = frame
+            if fen is not None:
+                slot["fen"] = fen
+            self.slot = slot
+
+    def clear(self):
+        """Close all windows (done by the viewer thread, which owns them)"""
+        with self.lock:
+            self.slot = None
+            self.clear_requested = True
+
+    def takeQuit(self) -> bool:
+        """True once after 'q' was pressed in a viewer window"""
+        if self.quit_requested:
+            self.quit_requested = False
+            return True
+        return False
+
+    def _loop(self):
+        shown: dict = {}
+        while self.running:
+            start = time.monotonic()
+            with self.lock:
+                slot, self.slot = self.slot, None
+                clear, self.clear_requested = self.clear_requested, False
+            if clear:
+                cv2.destroyAllWindows()
+                shown = {}
+            if slot:
+                shown.update(slot)
+                self._draw(shown, slot)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                self.quit_requested = True
+            time.sleep(max(0.0, self.interval - (time.monotonic() - start)))
+        cv2.destroyAllWindows()
+
+    def _draw(self, shown: dict, new: dict):
+        if "frame" in new:
+            cv2.imshow("Chess Stream", new["frame"])
+        if "detections" in new and new.get("det_frame") is not None:
+            frame, warp = new["det_frame"], shown.get("warp")
+            if warp is not None and warp.H is not None:
+                frame = warp.warp(frame)
+            cv2.imshow("Detections", self.piece.visualizePieces(frame, new["detections"]))
+        if "fen" in new and new["fen"] != self._board_fen:
+            from renderFen2Img import render_fen
+            self._board_fen = new["fen"]
+            self._board_img = render_fen(self._board_fen)
+            cv2.imshow("Chess board", self._board_img)
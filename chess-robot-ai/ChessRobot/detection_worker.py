@@ -0,0 +1,186 @@
+"""
+Piece detection in a separate process
+RemotePiece has the Piece interface used by FEN.getFEN but runs the model in a worker process:
+frames go through a SharedFrameBus, and only the compact detection arrays (boxes, confs,
+class ids) come back over a Pipe. The asyncio process keeps handling TCP while inference runs
+on other cores. If the worker dies, RemotePiece loads the model in-process and carries on.
+"""
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+
+from typing import List, Optional
+
+from frame_bus import SharedFrameBus
+from piece import Piece
+from backends import Prediction
+from detections import Detections
+
+log = logging.getLogger(__name__)
+
+# Seconds between liveness checks while waiting on the worker
+POLL_INTERVAL = 0.5
+# Bus names stay unique when a worker is restarted within one process
+_bus_ids = itertools.count()
+
+
+def workerMain(bus_name, shape, slots, model_path, backend, variant, conn):
+    """Worker process entry point"""
+    bus = SharedFrameBus(bus_name, shape, slots)
+    piece = Piece(model_path, backend=backend, variant=variant)
+    conn.send(("ready", piece.model.names))
+    try:
+        while True:
+            msg = conn.recv()
+            if msg[0] == "stop":
+                break
+            _, seq, conf, iou, imgsz = msg
+            frame = bus.view(seq)
+            if frame is None:
+                conn.send(("stale", seq, None))
+                continue
+            pred = piece.model.predict([frame], conf=conf, iou=iou, imgsz=imgsz)[0]
+            # The frame was read in place: if the writer lapped us, the result is unusable
+            if not bus.valid(seq):
+                conn.send(("stale", seq, None))
+                continue
+            boxes, confs, clss = pred
+            conn.send(("ok", seq, (np.asarray(boxes, np.float32), np.asarray(confs, np.float32),
+                                   np.asarray(clss, np.int32))))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        bus.close()
+
+
+class WorkerDied(RuntimeError):
+    """The detection worker exited or stopped answering"""
+
+
+class WorkerModel():
+    """
+    Backend-like proxy (names, predict) for the model running in the worker process
+    Every wait polls the pipe and the process, so a dead worker raises WorkerDied instead of
+    blocking the caller forever.
+    """
+
+    def __init__(self, path, shape, slots, backend: Optional[str] = None, variant: Optional[str] = None,
+                 timeout: float = 10.0):
+        self.timeout = timeout
+        self.bus = SharedFrameBus(f"chessbus_{os.getpid()}_{next(_bus_ids)}", shape, slots, create=True)
+        ctx = mp.get_context("spawn")
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=workerMain, daemon=True,
+                                   args=(self.bus.name, shape, slots, path, backend, variant, child))
+        try:
+            self.process.start()
+            # Only the worker may hold the child end, otherwise its death never reaches us as EOF
+            child.close()
+            # Model loading has no deadline; the worker dying while loading still ends the wait
+            _, self.names = self.receive(None)
+        except BaseException:
+            self.close()
+            raise
+        log.info("[DETECTION WORKER] Started pid %s, bus %s %s x%d", self.process.pid, self.bus.name, shape, slots)
+
+    def receive(self, timeout: Optional[float]):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                if self.conn.poll(POLL_INTERVAL):
+                    return self.conn.recv()
+            except (EOFError, OSError):
+                raise self.died()
+            if not self.process.is_alive():
+                raise self.died()
+            if deadline is not None and time.monotonic() > deadline:
+                raise WorkerDied(f"detection worker did not answer within {timeout}s")
+
+    def died(self) -> WorkerDied:
+        # EOF can arrive just before the process is reaped
+        self.process.join(timeout=1)
+        return WorkerDied(f"detection worker exited (code {self.process.exitcode})")
+
+    def predict(self, frames: List[np.ndarray], conf: float = 0.50, iou: float = 0.5,
+                imgsz: Optional[int] = None) -> List[Prediction]:
+        preds: List[Prediction] = []
+        for frame in frames:
+            seq = self.bus.write(frame)
+            try:
+                self.conn.send(("detect", seq, conf, iou, imgsz))
+            except (BrokenPipeError, OSError):
+                raise self.died()
+            status, _seq, pred = self.receive(self.timeout)
+            if status != "ok":
+                pred = (np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int32))
+            preds.append(pred)
+        return preds
+
+    def close(self):
+        try:
+            self.conn.send(("stop",))
+        except (BrokenPipeError, OSError):
+            pass
+        if self.process.is_alive():
+            self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+        self.bus.close()
+
+
+class RemotePiece(Piece):
+    def __init__(self, path, shape=(480, 640, 3), slots=4, backend: Optional[str] = None,
+                 variant: Optional[str] = None, timeout: float = 10.0, fallback: bool = True):
+        """
+        Args:
+            path: Piece model path (loaded in the worker)
+            shape: Largest frame shape sent to the worker
+            slots: Frame slots in the shared-memory bus
+            timeout: Seconds to wait for one detection before the worker is considered dead
+            fallback: Load the model in-process when the worker dies, instead of raising WorkerDied
+        """
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.timeout = timeout
+        self.fallback = fallback
+        self.source = (path, backend, variant)
+        super().__init__(path, backend=backend, variant=variant)
+
+    def loadModel(self, path, backend: Optional[str] = None, variant: Optional[str] = None):
+        try:
+            return WorkerModel(path, self.shape, self.slots, backend, variant, self.timeout)
+        except WorkerDied as e:
+            if not self.fallback:
+                raise
+            log.warning("[DETECTION WORKER] %s - running the piece model in-process", e)
+            return super().loadModel(path, backend, variant)
+
+    def fallBack(self, error: WorkerDied):
+        if not self.fallback or not isinstance(self.model, WorkerModel):
+            raise error
+        log.warning("[DETECTION WORKER] %s - running the piece model in-process", error)
+        self.model.close()
+        self.model = Piece.loadModel(self, *self.source)
+
+    def detectPieces(self, frame: np.ndarray, imgsz: Optional[int] = None) -> Detections:
+        try:
+            return super().detectPieces(frame, imgsz)
+        except WorkerDied as e:
+            self.fallBack(e)
+            return super().detectPieces(frame, imgsz)
+
+    def detectPiecesBatch(self, frames: List[np.ndarray], batch_size: Optional[int] = None) -> List[Detections]:
+        try:
+            return super().detectPiecesBatch(frames, batch_size)
+        except WorkerDied as e:
+            self.fallBack(e)
+            return super().detectPiecesBatch(frames, batch_size)
+
+    def close(self):
+        if isinstance(self.model, WorkerModel):
+            self.model.close()
@@ -0,0 +1,117 @@
+"""
+Array-backed piece detections
+Boxes, confidences and class ids are kept as contiguous NumPy arrays; class names are
+resolved to FEN symbols once per model through a lookup table instead of per box.
+"""
+import numpy as np
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+# Board cell codes: 0 = empty, 1..12 = FEN symbols
+SYMBOLS = np.array([".", "P", "N", "B", "R", "Q", "K", "p", "n", "b", "r", "q", "k"])
+EMPTY = 0
+SYM_TO_CODE: Dict[str, int] = {str(s): i for i, s in enumerate(SYMBOLS)}
+
+NAME_TO_SYM: Dict[str, str] = {
+    "white_pawn": "P", "white_knight": "N", "white_bishop": "B",
+    "white_rook": "R", "white_queen": "Q", "white_king": "K",
+    "black_pawn": "p", "black_knight": "n", "black_bishop": "b",
+    "black_rook": "r", "black_queen": "q", "black_king": "k",
+}
+
+# Point of a box that sits on the board: horizontally centred, close to the piece base.
+# Empirical choice for upright pieces seen by the oblique overhead camera: the base is near the
+# bottom edge, and 0.8 of the box height stays inside the base square for the tall back-rank
+# pieces. It is not taken from ChessMapper; with FEN.check_cells (CHESSROBOT_CHECK_CELLS=1)
+# frames where ChessMapper disagrees are counted in fen_cell_assign_mismatches_total.
+ANCHOR_Y = 0.8
+
+
+def buildCodeTable(names: Dict[int, str]) -> np.ndarray:
+    """Map model class id -> board cell code (unknown classes map to EMPTY)"""
+    size = max(names.keys()) + 1 if names else 0
+    table = np.zeros(size, dtype=np.int8)
+    for cls_id, name in names.items():
+        table[int(cls_id)] = SYM_TO_CODE.get(NAME_TO_SYM.get(name, name), EMPTY)
+    return table
+
+
+def _sizeWH(size: Union[int, Tuple[int, int], List[int]]) -> Tuple[float, float]:
+    if np.isscalar(size):
+        return float(size), float(size)
+    w, h = size[0], size[1]
+    return float(w), float(h)
+
+
+class Detections():
+    __slots__ = ("boxes", "confs", "cls", "names", "codes")
+
+    def __init__(self, boxes: np.ndarray, confs: np.ndarray, cls: np.ndarray,
+                 names: Dict[int, str], table: np.ndarray):
+        self.boxes = np.ascontiguousarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.confs = np.ascontiguousarray(confs, dtype=np.float32).reshape(-1)
+        self.cls = np.ascontiguousarray(cls, dtype=np.int32).reshape(-1)
+        self.names = names
+        self.codes = table[self.cls] if len(self.cls) else np.zeros(0, dtype=np.int8)
+
+    @classmethod
+    def empty(cls, names: Optional[Dict[int, str]] = None, table: Optional[np.ndarray] = None) -> "Detections":
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0), names or {},
+                   table if table is not None else np.zeros(0, dtype=np.int8))
+
+    def __len__(self) -> int:
+        return len(self.confs)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Legacy per-box dict view, only for code that still expects it"""
+        for (x1, y1, x2, y2), conf, cls_id in zip(self.boxes.tolist(), self.confs.tolist(), self.cls.tolist()):
+            yield {
+                "class_name": self.names.get(cls_id, str(cls_id)),
+                "confidence": conf,
+                "box": [int(x1), int(y1), int(x2), int(y2)],
+            }
+
+    @property
+    def symbols(self) -> np.ndarray:
+        return SYMBOLS[self.codes]
+
+    def anchors(self) -> np.ndarray:
+        """(N, 2) image points where each piece touches the board"""
+        x = (self.boxes[:, 0] + self.boxes[:, 2]) * 0.5
+        y = self.boxes[:, 1] + (self.boxes[:, 3] - self.boxes[:, 1]) * ANCHOR_Y
+        return np.stack([x, y], axis=1)
+
+    def assignCells(self, H: Optional[np.ndarray], size) -> Tuple[np.ndarray, np.ndarray]:
+        """Place detections on the 8x8 grid of a board space of the given size
+
+        H maps image points into board space (None when boxes already are in board space).
+        Returns (codes, confs): int8 cell codes and the confidence of the winning box per cell.
+        When several boxes fall into one cell the most confident one wins.
+        """
+        codes = np.zeros((8, 8), dtype=np.int8)
+        confs = np.zeros((8, 8), dtype=np.float32)
+        if len(self) == 0:
+            return codes, confs
+
+        pts = self.anchors()
+        if H is not None:
+            H = np.asarray(H, dtype=np.float64)
+            hom = pts @ H[:, :2].T + H[:, 2]
+            pts = hom[:, :2] / hom[:, 2:3]
+
+        w, h = _sizeWH(size)
+        col = np.floor(pts[:, 0] * (8.0 / w)).astype(np.int64)
+        row = np.floor(pts[:, 1] * (8.0 / h)).astype(np.int64)
+        valid = (col >= 0) & (col < 8) & (row >= 0) & (row < 8) & (self.codes != EMPTY)
+        if not valid.any():
+            return codes, confs
+
+        flat = (row * 8 + col)[valid]
+        conf = self.confs[valid]
+        code = self.codes[valid]
+        order = np.argsort(-conf, kind="stable")
+        cells, first = np.unique(flat[order], return_index=True)
+        win = order[first]
+        codes.flat[cells] = code[win]
+        confs.flat[cells] = conf[win]
+        return codes, confs
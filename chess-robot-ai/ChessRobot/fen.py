@@ -1,16 +1,29 @@
-from ultralytics import YOLO
 import numpy as np
-import cv2
 import re
 import json
+import os
 import asyncio
+import logging
 import chess
 import chess.engine
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Optional
 
 from core.chess_mapping import ChessMapper
 from core.chess_processing import ChessProcessor
 from network.socket_client import TCPClient
+from detections import SYMBOLS, SYM_TO_CODE
+from board_roi import BoardWarp, boardQuad
+from change_gate import DetectionCascade
+from fusion import SquareEvidence
+from move_infer import MoveIndex, castlingInProgress, describeChange
+import metrics
+
+log = logging.getLogger(__name__)
+
+GETFEN_SECONDS = metrics.histogram("fen_getfen_seconds", "FEN.getFEN latency (gated calls that skip detection included)")
+UPDATEFEN_SECONDS = metrics.histogram("fen_updatefen_seconds", "FEN.updateFEN latency, including the server round trip")
+STOCKFISH_SECONDS = metrics.histogram("fen_sendoutput_seconds", "FEN.sendOutput latency (Stockfish search)")
+CELL_MISMATCHES = metrics.counter("fen_cell_assign_mismatches_total", "Frames where Detections.assignCells disagreed with ChessMapper")
 
 class FEN():
     def __init__(self, id):
@@ -23,6 +36,33 @@ class FEN():
         self.processor = ChessProcessor()
         self.mapper = ChessMapper()
         self.proc_size = self.processor.get_processing_size()
+        # Board-ROI inference: detect on the warped board canvas instead of the full frame
+        self.roi: Optional[BoardWarp] = None
+        # Board quad in processed-frame coordinates, derived and validated once per corner set
+        self._quad_key = None
+        self._quad: Optional[np.ndarray] = None
+        # Debug: also run ChessMapper on full-frame detections and count frames where it places
+        # pieces differently from Detections.assignCells (which always decides)
+        self.check_cells = False
+        # Motion -> hand -> piece cascade for getFEN(..., gated=True)
+        self.cascade = DetectionCascade(settle_time=0.4)
+        # Per-game evidence over several detection frames, gated getFEN only emits stable boards
+        self.evidence = SquareEvidence()
+        self.last_detections = None
+        # BoardWarp the last detections are in (None: full-frame coordinates)
+        self.last_warp: Optional[BoardWarp] = None
+        # Optional blackbox.BlackBox; updateFEN records its decision for each candidate FEN
+        self.blackbox = None
+        # Largest colour/occupancy distance between the observed board and a legal move's board
+        # for the move to be accepted (covers one missed or phantom piece)
+        self.max_move_distance = 1
+        # Live game board: FEN_last is derived from it, setting FEN_last starts a new board and
+        # accepted moves are pushed; legal moves, move index and status flags are cached per position
+        self.board: chess.Board = None
+        self._fen: Optional[str] = None
+        self.legal_moves: List[chess.Move] = []
+        # Legal-move outcome index of the live board, rebuilt only when the position changes
+        self.move_index: Optional[MoveIndex] = None
 
         self.checkMove, self.isValid, self.isCheck, self.isCheckmate, self.isStalemate, self.isGameover = False, False, False, False, False, False
         self.id = id
@@ -39,7 +79,6 @@ class FEN():
             self.FEN_last = "RNBQKBNR/PPPPPPPP/8/8/8/8/pppppppp/rnbqkbnr b - - 0 1"
             self.side = "w"
 
-        self.change = {}
         self.showStatus()
 
         self.tcp_client = None, None
@@ -51,6 +90,10 @@ class FEN():
         self.skill_level = 10
         self.analysis_time = 0.1
         self.depth_limit = 12
+        # Engine options besides the skill level (see setEngineOptions); sent to Stockfish only
+        # when the effective set changes. Half the cores leave room for the detection models
+        self.engine_options = {"Threads": max(1, (os.cpu_count() or 2) // 2), "Hash": 64}
+        self._engine_config: Optional[Dict[str, Any]] = None
 
 # TCP Client Config and Publish
     def tcp_config(self, host: str, port: int):
@@ -70,7 +113,7 @@ class FEN():
 
     async def send_check_notification(self, tcp_client, game_id: Optional[str] = None):
         """Send check notification to server"""
-        board = chess.Board(self.FEN_last)
+        board = self.board
         
         # Determine which player is in check
         player_in_check = "white" if board.turn == chess.WHITE else "black"
@@ -84,21 +127,21 @@ class FEN():
         }
         
         await self.tcp_publish(tcp_client, check_message)
-        print(f"[CHECK NOTIFICATION] Sent: {player_in_check} king is in check")
+        log.info("[CHECK NOTIFICATION] Sent: %s king is in check", player_in_check)
         return
 
     async def send_game_over_notification(self, tcp_client, game_id: Optional[str] = None):
         """Send game over notification to server when checkmate or stalemate occurs"""
-        board = chess.Board(self.FEN_last)
+        board = self.board
         
         # Determine game over reason and winner
-        if board.is_checkmate():
+        if self.isCheckmate:
             # The player whose turn it is has been checkmated (they lose)
             loser = "white" if board.turn == chess.WHITE else "black"
             winner = "black" if loser == "white" else "white"
             reason = "checkmate"
             message = f"Checkmate! {winner.capitalize()} wins"
-        elif board.is_stalemate():
+        elif self.isStalemate:
             winner = None
             reason = "stalemate"
             message = "Stalemate! Game is a draw"
@@ -118,9 +161,15 @@ class FEN():
         }
         
         await self.tcp_publish(tcp_client, game_over_message)
-        print(f"[GAME OVER] {message} - Reason: {reason}")
+        log.info("[GAME OVER] %s - Reason: %s", message, reason)
+        await self.dump_blackbox("game_over", game_id)
         return
 
+    async def dump_blackbox(self, reason: str, game_id: Optional[str] = None):
+        """Write the black-box ring to disk without blocking the event loop"""
+        if self.blackbox is not None:
+            await asyncio.to_thread(self.blackbox.dump, reason, game_id=game_id, fen_last=self.FEN_last)
+
     async def send_board_setup_status(self, tcp_client, detected_fen: str, game_id: Optional[str] = None):
         """Send board setup status to server - compares with expected initial position"""
         # FEN_last contains either initial position (normal game) or puzzle FEN (puzzle mode)
@@ -140,7 +189,7 @@ class FEN():
         }
         
         await self.tcp_publish(tcp_client, status_message)
-        print(f"[BOARD_STATUS] {status_message['status'].upper()} - Expected: {expected_fen}, Detected: {current_fen}")
+        log.info("[BOARD_STATUS] %s - Expected: %s, Detected: %s", status_message['status'].upper(), expected_fen, current_fen)
         return is_correct
 
     async def check_and_send_board_status(self, tcp_client, detected_fen: str, game_id: Optional[str] = None) -> bool:
@@ -161,33 +210,52 @@ class FEN():
         self.analysis_time = config["time"]
         self.depth_limit = config["depth"]
         
-        print(f"[AI DIFFICULTY] Set to '{self.difficulty}': Skill Level={self.skill_level}, Time={self.analysis_time}s, Depth={self.depth_limit}")
+        log.info("[AI DIFFICULTY] Set to '%s': Skill Level=%s, Time=%ss, Depth=%s", self.difficulty, self.skill_level, self.analysis_time, self.depth_limit)
+
+    def setEngineOptions(self, threads: Optional[int] = None, hash_mb: Optional[int] = None, **options):
+        """Override Stockfish UCI options; applied before the next search"""
+        if threads is not None:
+            self.engine_options["Threads"] = threads
+        if hash_mb is not None:
+            self.engine_options["Hash"] = hash_mb
+        self.engine_options.update(options)
+        log.info("[ENGINE] Options %s", self.engine_options)
 
 # Message processing
-    def sendOutput(self, stockfish):
+    async def configureEngine(self, stockfish):
+        """Apply skill and engine options, only when they differ from what the engine already has"""
+        config = {**self.engine_options, "Skill Level": self.skill_level}
+        if config != self._engine_config:
+            await stockfish.configure(config)
+            self._engine_config = config
+            log.info("[ENGINE] Configured %s", config)
+
+    @STOCKFISH_SECONDS.time()
+    async def sendOutput(self, stockfish):
+        """Best move for the side to move via the asyncio engine; cancelling the caller stops the search"""
         fen_str = self.FEN_last
         isCheck = self.isCheck
         isCheckmate = self.isCheckmate
         isStalemate = self.isStalemate
         isGameover = self.isGameover
 
-        board = chess.Board(self.FEN_last)
+        board = self.board
         
         # If game is over, no move can be generated
-        if board.is_game_over():
-            print("[WARNING] Game is over - cannot generate move")
+        if self.isGameover:
+            log.warning("Game is over - cannot generate move")
             return None
         
         # Configure Stockfish with difficulty settings
-        stockfish.configure({"Skill Level": self.skill_level})
+        await self.configureEngine(stockfish)
         
-        # Use difficulty-based time and depth limits
+        # Use difficulty-based time and depth limits; the event loop keeps serving commands meanwhile
         limit = chess.engine.Limit(time=self.analysis_time, depth=self.depth_limit)
-        result = stockfish.analyse(board, limit)
+        result = await stockfish.analyse(board.copy(), limit)
 
         # Check if result has 'pv' key (principal variation)
         if "pv" not in result or len(result["pv"]) == 0:
-            print("[WARNING] No best move found - game may be over or position invalid")
+            log.warning("No best move found - game may be over or position invalid")
             return None
             
         bestmove = result["pv"][0]
@@ -205,9 +273,8 @@ class FEN():
         to_piece = board.piece_at(to_sq)
         san = board.san(bestmove)
 
-        # Make the move to get the updated position
-        board.push(bestmove)
-        results_in_check = board.is_check()
+        # Checked without pushing, the live board only advances on detected moves
+        results_in_check = board.gives_check(bestmove)
         
         def piece_label(p):
             if p is None:
@@ -230,7 +297,12 @@ class FEN():
         }
 
 ############################## 
-    def normalBoard(self, raw_board: List[List[str]]) -> List[List[str]]:
+    def normalBoard(self, raw_board) -> List[List[str]]:
+        if isinstance(raw_board, np.ndarray) and raw_board.dtype.kind in "iu":
+            # 8x8 cell codes from Detections.assignCells
+            if raw_board.shape != (8, 8):
+                raise ValueError("Invalid board size")
+            return SYMBOLS[raw_board].tolist()
         out: List[List[str]] = []
         for r in range(8):
             row_chars: List[str] = []
@@ -271,303 +343,131 @@ class FEN():
             self.side = "w" 
         return
 
-    def getPiece(self, board, sq):
-        piece = board.piece_at(sq)
-        if piece != None:
-            return piece.symbol()
-        return ""
-
-    def getMoves(self):
-        board = chess.Board(self.FEN_last)
-        return board.legal_moves
-
-    def isMove(self, sq1, piece11, piece12, sq2, piece21, piece22):
-        if (piece12 == "" and piece21 == "" and piece11 == piece22):
-            return 1  # Move
-        if (piece11 == "" and piece22 == "" and piece12 == piece21):
-            return 1  # Move
-        
-        if (piece11 == "" and piece22 == piece12 and piece21 == ""):
-            return 2  # Attack
-        if (piece22 == "" and piece12 == piece21):
-            return 2  # Attack
-        if (piece12 == "" and piece11 == piece22):
-            return 2  # Attack
-        
-        if (piece12 == "" and piece21 == "" and 
-            ((piece11 in ["K", "Q"] and piece22 in ["K", "Q"]) or
-            (piece11 in ["k", "q"] and piece22 in ["k", "q"]))
-            ):
-            return 3  # Move Recog Error
-        if (piece11 == "" and piece22 == "" and 
-            ((piece12 in ["K", "Q"] and piece21 in ["K", "Q"]) or
-            (piece12 in ["k", "q"] and piece21 in ["k", "q"]))
-            ):
-            return 5  # Move Recog Error
-        
-        if (piece11 == "" and piece21 == "" and 
-            ((piece12 in ["K", "Q"] and piece22 in ["K", "Q"]) or
-            (piece12 in ["k", "q"] and piece22 in ["k", "q"]))
-            ):
-            return 4  # Attack Recog Error
-        if (piece22 == "" and 
-            ((piece12 in ["K", "Q"] and piece21 in ["K", "Q"]) or
-            (piece12 in ["k", "q"] and piece21 in ["k", "q"]))
-            ):
-            return 6  # Attack Recog Error
-        if (piece21 == "" and
-            ((piece11 in ["K", "Q"] and piece22 in ["K", "Q"]) or
-            (piece11 in ["k", "q"] and piece22 in ["k", "q"]))
-            ):
-           return 8  # Attack Recog Error
-        if (piece12 == "" and
-            ((piece11 in ["K", "Q"] and piece22 in ["K", "Q"]) or
-            (piece11 in ["k", "q"] and piece22 in ["k", "q"]))
-            ):
-           return 10  # Attack Recog Error
-        return 0
-
-    def getChange(self, fen: str):
-        change = []
-        board = chess.Board(self.FEN_last)
-        boardN = chess.Board(fen)
-        for c in ["a", "b", "c", "d", "e", "f", "g", "h"]:
-            for i in range(1, 9):
-                sq = str(c) + str(i)
-                square = chess.parse_square(sq)
-                piece = self.getPiece(board, square)
-                pieceN = self.getPiece(boardN, square)
-                if piece != pieceN:
-                    change.append((sq, piece, pieceN))
-        return len(change), change
-    
-    def checkChange(self, fen: str):
-        lC, change = self.getChange(fen)
-        self.change = {0: [], 1: [], 2: []}
-        check = {}
-        for i in range(lC):
-            if i in check:
-                continue
-            (sqI, pieceI, pieceIN) = change[i]
-            check[i] = 1
-            state = 0
-            for j in range(lC):
-                if j not in check:
-                    (sqJ, pieceJ, pieceJN) = change[j]
-                    mv = self.isMove(sqI, pieceI, pieceIN, sqJ, pieceJ, pieceJN)
-                    if mv == 1:
-                        self.change[1].append((sqI, pieceI, pieceIN, sqJ, pieceJ, pieceJN))
-                        check[j] = 1
-                        state = 1
-                        break
-                    elif mv == 2:
-                        self.change[2].append((sqI, pieceI, pieceIN, sqJ, pieceJ, pieceJN))
-                        check[j] = 1
-                        state = 1
-                        break
-            if state == 0:
-                self.change[0].append((sqI, pieceI, pieceIN))
+    @property
+    def FEN_last(self) -> str:
+        """FEN of the live game board"""
+        if self._fen is None:
+            self._fen = self.board.fen()
+        return self._fen
+
+    @FEN_last.setter
+    def FEN_last(self, fen: str):
+        """Start over from a FEN (new game, puzzle, resume); accepted moves then go through pushMove"""
+        self.board = chess.Board(fen)
+        self.positionChanged()
+
+    def pushMove(self, move: chess.Move):
+        self.board.push(move)
+        self.positionChanged()
+
+    def positionChanged(self):
+        """Refresh everything cached per position: FEN string, legal moves, move index, status flags"""
+        board = self.board
+        self._fen = None
+        self.move_index = None
+        self.legal_moves = list(board.legal_moves)
+        self.isValid = board.is_valid()
+        self.isCheck = board.is_check()
+        self.isCheckmate = self.isCheck and not self.legal_moves
+        self.isStalemate = not self.isCheck and not self.legal_moves
+        self.isGameover = not self.legal_moves or board.is_game_over()
 
-        return
+    def getMoveIndex(self) -> MoveIndex:
+        if self.move_index is None:
+            self.move_index = MoveIndex(self.board)
+        return self.move_index
 
-    def checkLegalMove(self, sqI, sqJ, moves):
-        move1 = chess.Move.from_uci(sqI + sqJ)
-        move2 = chess.Move.from_uci(sqJ + sqI)
-        if move1 in moves:
-            print("Legal Move: " + str(move1))
-            return True
-        elif move2 in moves:
-            print("Legal Move: " + str(move2))
-            return True
-        else:
-            print("Illegal Move: " + str(move1))
-            return False
-
-    def checkQueenKing(self, fen: str):
-        board = chess.Board(self.FEN_last)
-        boardN = chess.Board(fen)
-        nQ, nK, nq, nk = 0, 0, 0, 0
-        for c in ["a", "b", "c", "d", "e", "f", "g", "h"]:
-            for i in range(1, 9):
-                sq = str(c) + str(i)
-                square = chess.parse_square(sq)
-                pieceN = self.getPiece(boardN, square)
-                if pieceN == "Q":
-                    nQ += 1
-                if pieceN == "K":
-                    nK += 1
-                if pieceN == "q":
-                    nq += 1
-                if pieceN == "k":
-                    nk += 1
-        if (((nK > 1 or nk > 1) and (nQ == 0 or nq == 0)) or 
-            ((nK == 0 or nk == 0) and (nQ > 1 or nq > 1))
-            ):
-            print("Error: More than one King and missing Queen")        
-            for c in ["a", "b", "c", "d", "e", "f", "g", "h"]:
-                for i in range(1, 9):
-                    sq = str(c) + str(i)
-                    square = chess.parse_square(sq)
-                    piece = self.getPiece(board, square)
-                    pieceN = self.getPiece(boardN, square)
-                    if piece != pieceN:
-                        if piece in ["K", "k", "Q", "q"] and pieceN in ["K", "k", "Q", "q"]:
-                            boardN.set_piece_at(chess.parse_square(sq), chess.Piece.from_symbol(piece))
-                            print("Fix: " + sq + " " + pieceN + " to " + piece)
-
-        return boardN.fen()
-
-    def checkRecog(self, fen: str):
-        fenC = self.checkQueenKing(fen)
-        board = chess.Board(self.FEN_last)
-        boardN = chess.Board(fenC)
-        for c in ["a", "b", "c", "d", "e", "f", "g", "h"]:
-            for i in range(1, 9):
-                sq = str(c) + str(i)
-                square = chess.parse_square(sq)
-                piece = self.getPiece(board, square)
-                pieceN = self.getPiece(boardN, square)
-                if piece != pieceN:
-                    if ((piece in ["K", "Q", "B", "P", "N", "R"] and pieceN in ["K", "Q", "B", "P", "N", "R"]) or
-                       (piece in ["k", "q", "b", "p", "n", "r"] and pieceN in ["k", "q", "b", "p", "n", "r"])):
-                        boardN.set_piece_at(chess.parse_square(sq), chess.Piece.from_symbol(piece))
-                        print("Fix: " + sq + " " + pieceN + " to " + piece)
-        return boardN.fen()
+    def getMoves(self):
+        return self.legal_moves
+
+    def enableRoiInference(self, size: int = 320, margin: float = 0.12):
+        """Switch getFEN to board-ROI inference on a size x size warped canvas
+
+        Canvas detections are placed with Detections.assignCells: ChessMapper works in the
+        processing-size board space of the full frame.
+        """
+        self.roi = BoardWarp(size, margin)
+        log.info("[ROI] Board-ROI inference enabled: canvas %dx%d, margin %s", size, size, margin)
+
+    def mapperCells(self, pieces, H) -> np.ndarray:
+        """8x8 cell codes as assigned by ChessMapper"""
+        mapped = self.mapper.map_pieces_to_board_space(list(pieces), H)
+        mapping_result = self.mapper.assign_pieces_to_cells(mapped)
+        board = self.normalBoard(mapping_result.chess_board)
+        return np.array([[SYM_TO_CODE[sym] for sym in row] for row in board], dtype=np.int8)
+
+    def boardQuad(self, cornersH, frame, piece) -> Optional[np.ndarray]:
+        """
+        cornersH (found on the raw camera frame) as a board quad in the processed frame
+        None when the corners cannot describe the board; logged once per corner set
+        """
+        key = (np.asarray(cornersH, dtype=np.float32).tobytes(), frame.shape[:2])
+        if key != self._quad_key:
+            self._quad_key = key
+            try:
+                self._quad = boardQuad(piece.processCorners(cornersH, frame.shape), frame.shape)
+            except (ValueError, TypeError) as e:
+                self._quad = None
+                log.warning("[ROI] Cannot build the board region from corners %s: %s - "
+                            "motion gating and ROI inference disabled", cornersH, e)
+        return self._quad
 
     def getFigure(self, fen: str):
         fenF = re.match(r'(.*?) ', fen).group(1)
         return fenF
 
-    def getFEN(self, frame, cornersH, hand, piece):
+    @GETFEN_SECONDS.time()
+    def getFEN(self, frame, cornersH, hand, piece, gated: bool = False):
+        """Detect the board FEN on a frame, None when no FEN is available
+
+        With gated=True the motion -> hand -> piece cascade decides which models run and
+        detections are fused over frames; None then also means "board unchanged or not yet
+        stable, keep the previous FEN".
+        """
         FEN_new = None
         try:
             if cornersH is None:
                 raise RuntimeError("Corners not found")
-            handBoard = hand.detectHand(frame, cornersH)
-            if handBoard:
-                return None
-
-            pieces = piece.detectPieces(frame)
-            H, _grid = self.mapper.create_homography_mapping(cornersH, frame, self.proc_size)
-            mapped = self.mapper.map_pieces_to_board_space(pieces, H)
-            mapping_result = self.mapper.assign_pieces_to_cells(mapped)
-
-            cand_board = self.normalBoard(mapping_result.chess_board)
+            quad = self.boardQuad(cornersH, frame, piece) if gated or self.roi is not None else None
+            if gated and quad is not None:
+                if not self.cascade.step(frame, cornersH, hand, quad):
+                    return None
+            else:
+                handBoard = hand.detectHand(frame, cornersH)
+                if handBoard:
+                    return None
+
+            if self.roi is not None and quad is not None:
+                pieces = piece.detectPiecesWarped(frame, self.roi, quad)
+                cells, confs = pieces.assignCells(*self.roi.boardSpace())
+                warp = self.roi
+            else:
+                pieces = piece.detectPieces(frame)
+                H, _grid = self.mapper.create_homography_mapping(cornersH, frame, self.proc_size)
+                cells, confs = pieces.assignCells(H, self.proc_size)
+                if self.check_cells:
+                    differ = self.mapperCells(pieces, H) != cells
+                    if differ.any():
+                        CELL_MISMATCHES.inc()
+                        log.debug("[CELLS] assignCells differs from ChessMapper on %d squares", int(differ.sum()))
+                warp = None
+            self.last_detections = pieces
+            self.last_warp = warp
+            if gated:
+                cells = self.evidence.add(cells, confs)
+                if cells is None:
+                    return None
+                self.cascade.commit()
+
+            cand_board = self.normalBoard(cells)
             FEN_board = self.Board2FEN(cand_board)
 
             FEN_new = f"{FEN_board} {self.side} - - 0 1"
-            print(f"[DEBUG] Detected FEN: {FEN_new}")
+            log.debug("Detected FEN: %s", FEN_new)
         except Exception as e:
-            print("FEN detection error:", e)
+            log.warning("FEN detection error: %s", e)
         return FEN_new
 
-    def checkFEN(self, fen: str):
-        checkMove = False
-        moves = self.getMoves()
-        fenC = self.checkRecog(fen)
-        print("[DEBUG] After checking check recog error, fen2:", fenC)
-
-        lC, change = self.getChange(fenC)
-        print("[DEBUG] Detected changes:", change)
-        boardN = chess.Board(fenC)
-        check = {}
-        for i in range(lC):
-            if i in check:
-                continue
-            (sqI, pieceI, pieceIN) = change[i]
-            check[i] = 1
-            state = 0
-            # Check Move and Attack
-            for j in range(lC):
-                if j not in check:
-                    (sqJ, pieceJ, pieceJN) = change[j]
-                    mv = self.isMove(sqI, pieceI, pieceIN, sqJ, pieceJ, pieceJN)
-                    if mv == 1:
-                        print("Move: " + str(change[i]) + " - " + str(change[j]))
-                        checkMove = self.checkLegalMove(sqI, sqJ, moves)
-                        check[j] = 1
-                        state = 1
-                        break
-                    elif mv == 3:
-                        print("Move Recog Err 3: " + str(change[i]) + " - " + str(change[j]))
-                        checkMove = self.checkLegalMove(sqI, sqJ, moves)
-                        if pieceI in ["K", "k", "Q", "q"]:
-                            boardN.set_piece_at(chess.parse_square(sqJ), chess.Piece.from_symbol(pieceI))
-                        elif pieceJ in ["K", "k", "Q", "q"]:
-                            boardN.set_piece_at(chess.parse_square(sqI), chess.Piece.from_symbol(pieceJ))
-                        check[j] = 1
-                        state = 1
-                        break
-                    elif mv == 5:
-                        print("Move Recog Err 5: " + str(change[i]) + " - " + str(change[j]))
-                        checkMove = self.checkLegalMove(sqI, sqJ, moves)
-                        if pieceI in ["K", "k", "Q", "q"]:
-                            boardN.set_piece_at(chess.parse_square(sqJ), chess.Piece.from_symbol(pieceI))
-                        elif pieceJ in ["K", "k", "Q", "q"]:
-                            boardN.set_piece_at(chess.parse_square(sqI), chess.Piece.from_symbol(pieceJ))
-                        check[j] = 1
-                        state = 1
-                        break
-                    elif mv == 2:
-                        print("Attack: " + str(change[i]) + " - " + str(change[j]))
-                        checkMove = self.checkLegalMove(sqI, sqJ, moves)
-                        check[j] = 1
-                        state = 1
-                        break
-                    elif mv == 4:
-                        print("Attack Recog Err 4: " + str(change[i]) + " - " + str(change[j]))
-                        checkMove = self.checkLegalMove(sqI, sqJ, moves)
-                        if pieceI in ["K", "k", "Q", "q"]:
-                            boardN.set_piece_at(chess.parse_square(sqJ), chess.Piece.from_symbol(pieceI))
-                        elif pieceJ in ["K", "k", "Q", "q"]:
-                            boardN.set_piece_at(chess.parse_square(sqI), chess.Piece.from_symbol(pieceJ))
-                        check[j] = 1
-                        state = 1
-                        break
-                    elif mv == 6:
-                        print("Attack Recog Err 6: " + str(change[i]) + " - " + str(change[j]))
-                        checkMove = self.checkLegalMove(sqI, sqJ, moves)
-                        if pieceI in ["K", "k", "Q", "q"]:
-                            boardN.set_piece_at(chess.parse_square(sqJ), chess.Piece.from_symbol(pieceI))
-                        elif pieceJ in ["K", "k", "Q", "q"]:
-                            boardN.set_piece_at(chess.parse_square(sqI), chess.Piece.from_symbol(pieceJ))
-                        check[j] = 1
-                        state = 1
-                        break
-                    elif mv == 8:
-                        print("Attack Recog Err 8: " + str(change[i]) + " - " + str(change[j]))
-                        checkMove = self.checkLegalMove(sqI, sqJ, moves)
-                        if pieceI in ["K", "k", "Q", "q"]:
-                            boardN.set_piece_at(chess.parse_square(sqJ), chess.Piece.from_symbol(pieceI))
-                        elif pieceJ in ["K", "k", "Q", "q"]:
-                            boardN.set_piece_at(chess.parse_square(sqI), chess.Piece.from_symbol(pieceJ))
-                        check[j] = 1
-                        state = 1
-                        break
-                    elif mv == 10:
-                        print("Attack Recog Err 10: " + str(change[i]) + " - " + str(change[j]))
-                        checkMove = self.checkLegalMove(sqI, sqJ, moves)
-                        if pieceI in ["K", "k", "Q", "q"]:
-                            boardN.set_piece_at(chess.parse_square(sqJ), chess.Piece.from_symbol(pieceI))
-                        elif pieceJ in ["K", "k", "Q", "q"]:
-                            boardN.set_piece_at(chess.parse_square(sqI), chess.Piece.from_symbol(pieceJ))
-                        check[j] = 1
-                        state = 1
-                        break
-            # Check Missing
-            if state == 0:
-                if pieceIN == "":
-                    print("Missing: " + str(change[i]))
-                    boardN.set_piece_at(chess.parse_square(sqI), chess.Piece.from_symbol(pieceI))
-                else:
-                    print("Recog Err: " + str(change[i]))
-                    boardN.set_piece_at(chess.parse_square(sqI), chess.Piece.from_symbol(pieceIN))
-
-        fenN = boardN.fen()
-        self.checkChange(fenN)
-        print(self.change)
-        return fenN, checkMove
-
     async def send_move_to_server(self, move_data: dict, tcp_client, game_id: Optional[str] = None):
         """Send move notification to server with game_id"""
         message = {
@@ -580,60 +480,64 @@ class FEN():
         await self.tcp_publish(tcp_client, message)
         
         move_info = move_data.get("move", {})
-        print(f"[MOVE] {move_info.get('notation', 'N/A')} - {move_info.get('from', '')} to {move_info.get('to', '')}")
+        log.info("[MOVE] %s - %s to %s", move_info.get('notation', 'N/A'), move_info.get('from', ''), move_info.get('to', ''))
         return
 
+    @UPDATEFEN_SECONDS.time()
     async def updateFEN(self, fen: str, stockfish, tcp_client, game_id: Optional[str] = None, check_setup: bool = False):
-        FEN_check, self.checkMove = self.checkFEN(fen)
         payload = {}
-        count = 0
-
-        FEN_lastF = self.getFigure(self.FEN_last)
-        FEN_checkF = self.getFigure(FEN_check)
-        check = True
+        index = self.getMoveIndex()
+        board = self.board
+        match = index.lookup(self.getFigure(fen), self.max_move_distance)
         illegal_move_info = None
-        
-        if len(self.change[0]) > 1 or len(self.change[1]) > 1 or len(self.change[2]) > 1:
-            check = False
-            if len(self.change[0]) == 0 and len(self.change[2]) == 0 and len(self.change[1]) == 2:
-                (sq1, piece1, piece1N, sq2, piece2, piece2N) = self.change[1][0]
-                (sq3, piece3, piece3N, sq4, piece4, piece4N) = self.change[1][1]
-                if ((piece1 in ["K", "k", "R", "r"] or piece2 in ["K", "k", "R", "r"]) and 
-                    (piece3 in ["K", "k", "R", "r"] or piece4 in ["K", "k", "R", "r"])):
-                    print("Castling detected, FEN updated.")
-                    check = True            
-            if not check:
-                print("Multiple changes detected, FEN not updated.")
-        elif not self.checkMove:
-            check = False
-            print("No valid move detected, FEN not updated.")
-            
-            # Capture illegal move details
-            if len(self.change[1]) > 0:  # Regular move
-                (sqI, pieceI, pieceIN, sqJ, pieceJ, pieceJN) = self.change[1][0]
-                illegal_move_info = {
-                    "from": sqI,
-                    "to": sqJ,
-                    "piece": pieceI if pieceI else pieceIN,
-                    "move_type": "move"
-                }
-            elif len(self.change[2]) > 0:  # Attack move
-                (sqI, pieceI, pieceIN, sqJ, pieceJ, pieceJN) = self.change[2][0]
+        accepted = False
+
+        if match.stay[0] == 0:
+            decision = "unchanged"
+        elif match.move is not None and match.distance < match.stay:
+            accepted = True
+            decision = "castling" if board.is_castling(match.move) else "move"
+            log.info("Move %s inferred (distance %s), FEN updated.", match.move, match.distance)
+        else:
+            vacated, arrived = describeChange(board, chess.BaseBoard(self.getFigure(fen)))
+            castling = castlingInProgress(board, vacated, arrived)
+            if castling is not None:
+                # King already moved, the rook follows: not illegal, just not finished
+                decision = "no_move"
+                log.info("Castling %s in progress, waiting for the rook.", castling)
+            elif len(vacated) == 1 and len(arrived) == 1:
+                # One piece of the side to move went somewhere it may not go
+                sqI, sqJ = vacated[0], arrived[0]
+                captured = board.piece_at(sqJ)
                 illegal_move_info = {
-                    "from": sqI,
-                    "to": sqJ,
-                    "piece": pieceI if pieceI else pieceIN,
-                    "captured": pieceJ if pieceJ else pieceJN,
-                    "move_type": "attack"
+                    "from": chess.square_name(sqI),
+                    "to": chess.square_name(sqJ),
+                    "piece": board.piece_at(sqI).symbol(),
+                    "move_type": "attack" if captured else "move"
                 }
+                if captured:
+                    illegal_move_info["captured"] = captured.symbol()
+                decision = "illegal_move"
+                log.info("No valid move detected, FEN not updated.")
+            elif len(vacated) > 1 or len(arrived) > 1:
+                decision = "multiple_changes"
+                log.info("Multiple changes detected, FEN not updated.")
+            else:
+                decision = "no_move"
+                log.info("No valid move detected, FEN not updated.")
+        self.checkMove = accepted
+
+        if accepted:
+            self.pushMove(match.move)
+        if self.blackbox is not None:
+            self.blackbox.decide(decision, self.FEN_last)
 
-        if FEN_checkF != FEN_lastF and check:
-            self.FEN_last = FEN_check
+        if accepted:
             self.changeSide()
             self.showStatus()
 
             if self.side == "w":
-                payload = self.sendOutput(stockfish)
+                payload = await self.sendOutput(stockfish)
             elif self.side == "b":
                 payload = {"fen_str": self.FEN_last}
                 # payload = self.sendOutput(stockfish)
@@ -643,10 +547,10 @@ class FEN():
                 if payload != self.last_payload:
                     await self.send_move_to_server(payload, tcp_client, game_id)
                 else:
-                    print("[MOVE] Same payload detected - skipping send")
+                    log.info("[MOVE] Same payload detected - skipping send")
                 self.last_payload = payload
             else:
-                print("[INFO] No move to send - game may be over")
+                log.info("No move to send - game may be over")
         
         # Send illegal move notification (only for human player - white)
         elif illegal_move_info is not None:
@@ -666,30 +570,18 @@ class FEN():
                 }
                 
                 await self.tcp_publish(tcp_client, illegal_payload)
-                print(f"[ILLEGAL_MOVE] {illegal_payload['message']}")
+                log.info("[ILLEGAL_MOVE] %s", illegal_payload['message'])
+                await self.dump_blackbox("illegal_move", game_id)
             else:
-                print(f"[INFO] Robot move validation failed - skipping (robot moves are always valid)")
+                log.info("Robot move validation failed - skipping (robot moves are always valid)")
             
         return
 
     def showStatus(self):
-        board = chess.Board(self.FEN_last)
-        self.isValid = board.is_valid()
-        self.isCheck = board.is_check()
-        self.isCheckmate = board.is_checkmate()
-        self.isStalemate = board.is_stalemate()
-        self.isGameover = board.is_game_over()
-        print('')
-        print("Board:")
-        print(board)
-        print('')
-        print("Is valid:", board.is_valid())
-        print("Is check:", board.is_check())
-        print("Is checkmate:", board.is_checkmate())
-        print("Is stalemate:", board.is_stalemate())
-        print("Is game over:", board.is_game_over())
-        print("Legal moves:", list(board.legal_moves))
-        print('')
+        # Formatted only when DEBUG is enabled for this module
+        log.debug("Board:\n%s\nIs valid: %s\nIs check: %s\nIs checkmate: %s\nIs stalemate: %s\nIs game over: %s\nLegal moves: %s",
+                  self.board, self.isValid, self.isCheck, self.isCheckmate, self.isStalemate, self.isGameover,
+                  self.legal_moves)
         return
 
 
@@ -0,0 +1,82 @@
+"""
+Shared-memory frame bus
+Preallocated frame slots in multiprocessing.shared_memory with per-slot sequence counters,
+so a detection worker process can read camera frames without pickling or copying them.
+Single writer, any number of readers. A reader checks the slot sequence again after use to
+know whether the writer overwrote the frame in the meantime.
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from typing import Optional, Tuple
+
+HEADER_ALIGN = 64
+
+
+class SharedFrameBus:
+    def __init__(self, name: str, shape: Tuple[int, int, int], slots: int = 4, create: bool = False):
+        """
+        Args:
+            name: Shared memory segment name
+            shape: Largest frame shape (h, w, c) a slot can hold
+            slots: Number of frame slots
+            create: Create (and own) the segment instead of attaching to it
+        """
+        self.name = name
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.owner = create
+        # Header: per-slot [seq, h, w] then the latest sequence number
+        self.header_len = slots * 3 + 1
+        header_bytes = -(-self.header_len * 8 // HEADER_ALIGN) * HEADER_ALIGN
+        frame_bytes = int(np.prod(self.shape))
+        size = header_bytes + slots * frame_bytes
+
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.header = np.ndarray((self.header_len,), dtype=np.int64, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=header_bytes)
+        if create:
+            self.header[:] = 0
+
+    @property
+    def latest_seq(self) -> int:
+        return int(self.header[-1])
+
+    def write(self, frame: np.ndarray) -> int:
+        """Copy a frame into the next slot and return its sequence number"""
+        h, w = frame.shape[:2]
+        if h > self.shape[0] or w > self.shape[1] or frame.shape[2:] != self.shape[2:]:
+            raise ValueError(f"Frame {frame.shape} does not fit bus slot {self.shape}")
+        seq = self.latest_seq + 1
+        slot = seq % self.slots
+        hdr = self.header[slot * 3:slot * 3 + 3]
+        hdr[0] = -1  # slot being written
+        self.frames[slot, :h, :w] = frame
+        hdr[1], hdr[2] = h, w
+        hdr[0] = seq
+        self.header[-1] = seq
+        return seq
+
+    def view(self, seq: int) -> Optional[np.ndarray]:
+        """Zero-copy view of frame seq, None if the slot no longer holds it"""
+        slot = seq % self.slots
+        hdr = self.header[slot * 3:slot * 3 + 3]
+        if hdr[0] != seq:
+            return None
+        return self.frames[slot, :hdr[1], :hdr[2]]
+
+    def valid(self, seq: int) -> bool:
+        """True while frame seq has not been overwritten"""
+        return self.header[(seq % self.slots) * 3] == seq
+
+    def close(self):
+        self.header = None
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
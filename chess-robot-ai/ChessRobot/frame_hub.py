@@ -0,0 +1,153 @@
+"""
+Single frame-grabber hub
+One thread reads the camera and publishes timestamped frames into a small ring buffer.
+Streaming, detection and corner finding each get their own reader instead of calling
+cam.read() on the shared device and stealing frames from one another.
+Published frames are shared between readers and must be treated as read-only.
+A hub without a camera has no capture thread: a HubTap publishes exactly the frames its one
+consumer reads (deterministic fast replay), and the other readers see those.
+"""
+import logging
+import threading
+import time
+
+from typing import Dict, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+
+class HubReader:
+    """cv2.VideoCapture-like view of a FrameHub with its own cursor and counters"""
+
+    def __init__(self, hub, name, every_frame=False, timeout=1.0):
+        """
+        Args:
+            hub: FrameHub to read from
+            name: Consumer name used in hub.stats()
+            every_frame: Deliver every frame in order (dropping only on ring overflow)
+                         instead of always jumping to the newest one
+            timeout: Seconds read() waits for a new frame before returning (False, None)
+        """
+        self.hub = hub
+        self.name = name
+        self.every_frame = every_frame
+        self.timeout = timeout
+        self.last_seq = 0
+        self.last_ts = 0.0
+        self.delivered = 0
+        self.dropped = 0
+
+    def read(self) -> Tuple[bool, Optional[object]]:
+        hub = self.hub
+        with hub.new_frame:
+            if not hub.new_frame.wait_for(lambda: hub.seq > self.last_seq or not hub.running, self.timeout):
+                return False, None
+            if hub.seq <= self.last_seq:
+                return False, None
+            if self.every_frame:
+                oldest = max(1, hub.seq - hub.size + 1)
+                want = max(self.last_seq + 1, oldest)
+            else:
+                want = hub.seq
+            self.dropped += want - self.last_seq - 1
+            seq, ts, frame = hub.ring[want % hub.size]
+        self.last_seq, self.last_ts = seq, ts
+        self.delivered += 1
+        return True, frame
+
+    def isOpened(self) -> bool:
+        return self.hub.running
+
+    def release(self):
+        pass
+
+
+class HubTap:
+    """read() passthrough of a source that also publishes every frame it returns to the hub"""
+
+    def __init__(self, hub, cam):
+        self.hub = hub
+        self.cam = cam
+
+    def read(self) -> Tuple[bool, Optional[object]]:
+        ok, frame = self.cam.read()
+        if ok:
+            self.hub.publish(frame)
+        return ok, frame
+
+    def isOpened(self) -> bool:
+        return self.cam.isOpened()
+
+    def release(self):
+        pass
+
+
+class FrameHub:
+    def __init__(self, cam=None, size=8):
+        """
+        Args:
+            cam: Opened cv2.VideoCapture (or anything with read()); None for a hub fed by tap()
+            size: Ring buffer length in frames
+        """
+        self.cam = cam
+        self.size = size
+        self.ring = [(0, 0.0, None)] * size
+        self.seq = 0
+        self.read_failures = 0
+        self.readers: Dict[str, HubReader] = {}
+        self.new_frame = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        if self.cam is not None:
+            self.thread = threading.Thread(target=self._loop, daemon=True)
+            self.thread.start()
+        log.info("[FRAME HUB] Started (ring of %d frames)", self.size)
+        return self
+
+    def stop(self):
+        with self.new_frame:
+            self.running = False
+            self.new_frame.notify_all()
+        if self.thread:
+            self.thread.join()
+        log.info("[FRAME HUB] Stopped")
+
+    def _loop(self):
+        while self.running:
+            ok, frame = self.cam.read()
+            if not ok:
+                self.read_failures += 1
+                time.sleep(0.01)
+                continue
+            self.publish(frame)
+
+    def publish(self, frame):
+        ts = time.time()
+        with self.new_frame:
+            self.seq += 1
+            self.ring[self.seq % self.size] = (self.seq, ts, frame)
+            self.new_frame.notify_all()
+
+    def latest(self) -> Tuple[int, float, Optional[object]]:
+        """(seq, timestamp, frame) of the newest frame without waiting"""
+        with self.new_frame:
+            return self.ring[self.seq % self.size]
+
+    def reader(self, name, every_frame=False, timeout=1.0) -> HubReader:
+        """Named consumer; latest-frame mode by default, every_frame=True to subscribe to all"""
+        reader = HubReader(self, name, every_frame, timeout)
+        self.readers[name] = reader
+        return reader
+
+    def tap(self, cam) -> HubTap:
+        """Consumer reading cam directly, publishing what it reads; for camera-less hubs"""
+        return HubTap(self, cam)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        out = {"hub": {"captured": self.seq, "read_failures": self.read_failures}}
+        for name, r in self.readers.items():
+            out[name] = {"delivered": r.delivered, "dropped": r.dropped}
+        return out
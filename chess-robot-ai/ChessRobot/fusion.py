@@ -0,0 +1,64 @@
+"""
+Temporal fusion of per-square class evidence
+Accumulates detection confidences in an 8x8x13 tensor (empty + 12 pieces) over a decaying
+window of frames and only releases a board once its argmax has been stable and confident.
+"""
+import numpy as np
+
+from typing import Optional, Tuple
+
+from detections import SYMBOLS, EMPTY
+
+
+class SquareEvidence():
+    def __init__(self, decay: float = 0.7, empty_conf: float = 0.5, min_stable: int = 3, min_conf: float = 0.6):
+        """
+        Args:
+            decay: Evidence multiplier applied per frame (0.7 ~ a 3-4 frame window)
+            empty_conf: Evidence added to the empty class of squares with no detection
+            min_stable: Consecutive frames the argmax board must stay unchanged
+            min_conf: Minimum per-square posterior (winning evidence / total) on every square
+        """
+        self.decay = decay
+        self.empty_conf = empty_conf
+        self.min_stable = min_stable
+        self.min_conf = min_conf
+        self.evidence = np.zeros((8, 8, len(SYMBOLS)), dtype=np.float32)
+        self.board = np.zeros((8, 8), dtype=np.int8)
+        self.stable = 0
+        self._rows, self._cols = np.indices((8, 8))
+
+    def reset(self):
+        self.evidence[:] = 0.0
+        self.board[:] = EMPTY
+        self.stable = 0
+
+    def add(self, codes: np.ndarray, confs: np.ndarray) -> Optional[np.ndarray]:
+        """Fold one frame of cell codes/confidences in; return the board once it is stable"""
+        ev = self.evidence
+        ev *= self.decay
+        weight = np.where(codes == EMPTY, self.empty_conf, confs).astype(np.float32)
+        ev[self._rows, self._cols, codes] += weight
+
+        board = ev.argmax(axis=2).astype(np.int8)
+        if np.array_equal(board, self.board):
+            self.stable += 1
+        else:
+            self.board = board
+            self.stable = 1
+
+        if self.stable < self.min_stable:
+            return None
+        if self.confidence().min() < self.min_conf:
+            return None
+        return board
+
+    def confidence(self) -> np.ndarray:
+        """(8, 8) posterior of the current argmax class per square"""
+        ev = self.evidence
+        total = ev.sum(axis=2)
+        best = ev[self._rows, self._cols, self.board]
+        return np.divide(best, total, out=np.zeros_like(best), where=total > 0)
+
+    def summary(self) -> Tuple[int, float]:
+        return self.stable, float(self.confidence().min())
@@ -0,0 +1,58 @@
+"""
+Logging setup shared by the chess AI modules
+Loggers only append records to a queue (QueueHandler); one listener thread formats and writes
+them, so a slow stdout/journald never blocks the frame loop. Use %-style arguments
+(log.debug("FEN %s", fen)) so disabled messages are never formatted.
+
+Levels:
+    CHESSROBOT_LOG_LEVEL   root level (default INFO)
+    CHESSROBOT_LOG_LEVELS  per-module overrides, e.g. "fen=DEBUG,camera_stream=WARNING"
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+from typing import Dict, Optional
+
+FORMAT = "[%(asctime)s] %(name)s %(levelname)s - %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def parseLevels(spec: str) -> Dict[str, str]:
+    """'fen=DEBUG,camera_stream=WARNING' -> {'fen': 'DEBUG', 'camera_stream': 'WARNING'}"""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setupLogging(level: Optional[str] = None, levels: Optional[Dict[str, str]] = None, stream=None):
+    """Route all logging through a queue to one writer thread; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        return _listener
+    level = level or os.environ.get("CHESSROBOT_LOG_LEVEL", "INFO")
+    if levels is None:
+        levels = parseLevels(os.environ.get("CHESSROBOT_LOG_LEVELS", ""))
+
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter(FORMAT))
+    _listener = logging.handlers.QueueListener(records, handler)
+
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(records)]
+    root.setLevel(level.upper())
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener.start()
+    # Drain what is still queued on exit
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,114 @@
+"""
+Bitboard move inference
+The observed board (a FEN placement from detection) is compared with the board every legal
+move would produce, as bitboards: two colour masks and six piece-type masks XORed and
+popcounted per move. The closest move wins. Castling, en passant and promotion need no
+special cases because their predicted boards already contain the rook jump, the removed
+pawn or the new piece.
+
+A distance is (colour, type):
+    colour: squares whose occupancy or piece colour differ (what a real move changes)
+    type:   squares with the right colour but another piece type (typical recognition errors,
+            e.g. K/Q or B/P confusion), used as a tie-breaker only
+"""
+import chess
+
+from typing import List, NamedTuple, Optional, Tuple
+
+Bitboards = Tuple[int, int, int, int, int, int, int, int]
+Distance = Tuple[int, int]
+
+
+def popcount(bb: int) -> int:
+    return bb.bit_count()
+
+
+def placementBitboards(board: chess.BaseBoard) -> Bitboards:
+    """(white, black, pawns, knights, bishops, rooks, queens, kings)"""
+    return (board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK], board.pawns,
+            board.knights, board.bishops, board.rooks, board.queens, board.kings)
+
+
+def distance(a: Bitboards, b: Bitboards) -> Distance:
+    colour = (a[0] ^ b[0]) | (a[1] ^ b[1])
+    types = (a[2] ^ b[2]) | (a[3] ^ b[3]) | (a[4] ^ b[4]) | (a[5] ^ b[5]) | (a[6] ^ b[6]) | (a[7] ^ b[7])
+    return popcount(colour), popcount(types & ~colour)
+
+
+class MoveMatch(NamedTuple):
+    move: Optional[chess.Move]
+    distance: Distance
+    # Distance of the observation to the unchanged position
+    stay: Distance
+
+
+class MoveIndex():
+    """
+    Outcome index of one position, built once and reused for every frame until the position changes
+    The placement string of each legal move's resulting board maps straight to the move, so a
+    clean observation is a single dictionary hit; noisy ones fall back to a Hamming search over
+    the precomputed bitboards.
+    """
+
+    def __init__(self, board: chess.Board):
+        self.board = board.copy(stack=False)
+        self.fen = board.fen()
+        self.current = placementBitboards(board)
+        self.entries = []
+        self.by_placement = {}
+        for move in self.board.legal_moves:
+            self.board.push(move)
+            bbs = placementBitboards(self.board)
+            self.entries.append((move, bbs))
+            # Distinct legal moves always leave distinct placements (promotions differ in the new piece)
+            self.by_placement[self.board.board_fen()] = MoveMatch(move, (0, 0), distance(self.current, bbs))
+            self.board.pop()
+        self.current_placement = self.board.board_fen()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, placement: str, k: int = 64) -> MoveMatch:
+        """
+        Closest legal move to an observed FEN placement
+        
+        Args:
+            placement: Board part of the observed FEN
+            k: Largest colour distance considered; move is None when no legal move is within k
+        """
+        if placement == self.current_placement:
+            return MoveMatch(None, (0, 0), (0, 0))
+        match = self.by_placement.get(placement)
+        if match is not None:
+            return match
+        return self.nearest(chess.BaseBoard(placement), k)
+
+    def nearest(self, observed: chess.BaseBoard, k: int = 64) -> MoveMatch:
+        obs = placementBitboards(observed)
+        stay = distance(self.current, obs)
+        best, best_dist = None, (k + 1, 0)
+        for move, bbs in self.entries:
+            colour = popcount((bbs[0] ^ obs[0]) | (bbs[1] ^ obs[1]))
+            if colour > best_dist[0]:
+                continue
+            d = distance(bbs, obs)
+            if d < best_dist:
+                best, best_dist = move, d
+        return MoveMatch(best, best_dist, stay)
+
+
+def describeChange(board: chess.Board, observed: chess.BaseBoard) -> Tuple[List[int], List[int]]:
+    """Squares the side to move vacated and squares it newly occupies in the observation"""
+    mover = board.occupied_co[board.turn]
+    seen = observed.occupied_co[board.turn]
+    return list(chess.scan_forward(mover & ~seen)), list(chess.scan_forward(seen & ~mover))
+
+
+def castlingInProgress(board: chess.Board, vacated: List[int], arrived: List[int]) -> Optional[chess.Move]:
+    """The legal castling move whose king step alone explains the change (rook not moved yet)"""
+    if len(vacated) != 1 or len(arrived) != 1:
+        return None
+    move = chess.Move(vacated[0], arrived[0])
+    if board.is_castling(move) and board.is_legal(move):
+        return move
+    return None
@@ -1,12 +1,19 @@
-from ultralytics import YOLO
 import numpy as np
 import cv2
 
-from typing import Any, Dict, List, Tuple, Optional
+from typing import List, Tuple, Optional
+
+from detections import Detections, buildCodeTable
+from backends import loadBackend, resolveModelPath
+import metrics
+
+DETECT_SECONDS = metrics.histogram("piece_detect_seconds", "Piece.detectPieces latency")
 
 class Piece():
-    def __init__(self, path):
-        self.model = YOLO(path)
+    def __init__(self, path, backend: Optional[str] = None, variant: Optional[str] = None,
+                 device: Optional[str] = None):
+        self.device = device
+        self.model = self.loadModel(path, backend, variant)
         self.label = {}
         self.label["white_pawn"] = "P"
         self.label["black_pawn"] = "p"
@@ -20,46 +27,71 @@ class Piece():
         self.label["black_queen"] = "q"
         self.label["white_king"] = "K"
         self.label["black_king"] = "k"
+        self.codeTable = buildCodeTable(self.model.names)
+
+    def loadModel(self, path, backend: Optional[str] = None, variant: Optional[str] = None):
+        """Anything with .names and predict(frames, conf, iou, imgsz) -> [(boxes, confs, clss)]"""
+        return loadBackend(resolveModelPath(path, variant), backend, device=self.device)
 
     def changeName(self, name):
         if name in self.label.keys():
             name = self.label[name]
         return name
 
-    def detectPieces(self, frame: np.ndarray) -> List[Dict[str, Any]]:
-        results = self.model(frame, conf=0.50, iou=0.5, verbose=False)
-        pieces: List[Dict[str, Any]] = []
-        for r in results:
-            if r.boxes is None:
-                continue
-            boxes = r.boxes.xyxy.cpu().numpy()
-            confs = r.boxes.conf.cpu().numpy()
-            clss = r.boxes.cls.cpu().numpy()
-            for (x1, y1, x2, y2), conf, cls_id in zip(boxes, confs, clss):
-                pieces.append({
-                    "class_name": r.names[int(cls_id)],
-                    "confidence": float(conf),
-                    "box": [int(x1), int(y1), int(x2), int(y2)],
-                })
-        return pieces
-
-    def visualizePieces(self, frame: np.ndarray, pieces: List[Dict[str, Any]]) -> np.ndarray:
+    def toDetections(self, pred) -> Detections:
+        boxes, confs, clss = pred
+        return Detections(boxes, confs, clss, self.model.names, self.codeTable)
+
+    @DETECT_SECONDS.time()
+    def detectPieces(self, frame: np.ndarray, imgsz: Optional[int] = None) -> Detections:
+        return self.toDetections(self.model.predict([frame], conf=0.50, iou=0.5, imgsz=imgsz)[0])
+
+    def warmup(self, frame: Optional[np.ndarray] = None):
+        """One throw-away inference so allocation/JIT costs are paid before the first game"""
+        if frame is None:
+            frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        self.detectPieces(frame)
+
+    def detectPiecesWarped(self, frame: np.ndarray, warp, cornersH=None) -> Detections:
+        """Run the model only on the board canvas produced by a BoardWarp.
+
+        Returned boxes are in canvas coordinates; use warp.boardSpace() to map them to cells
+        or warp.toImage() to draw them on the camera frame.
+        """
+        canvas = warp.warp(frame, cornersH)
+        return self.detectPieces(canvas, imgsz=warp.size)
+
+    def detectPiecesBatch(self, frames: List[np.ndarray], batch_size: Optional[int] = None) -> List[Detections]:
+        """Detect pieces on several frames, one forward pass per batch.
+
+        Returns one Detections per input frame, in the same order.
+        With batch_size=None all frames go through the model together.
+        """
+        frames = list(frames)
+        if not frames:
+            return []
+        step = batch_size or len(frames)
+        out: List[Detections] = []
+        for i in range(0, len(frames), step):
+            chunk = frames[i:i + step]
+            out.extend(self.toDetections(p) for p in self.model.predict(chunk, conf=0.50, iou=0.5))
+        return out
+
+    def visualizePieces(self, frame: np.ndarray, pieces: Detections) -> np.ndarray:
         vis = frame.copy()
-        for det in pieces:
-            x1, y1, x2, y2 = map(int, det["box"])
-            cls_name = self.changeName(det["class_name"])
-            conf = det["confidence"]
+        for (x1, y1, x2, y2), sym, conf in zip(pieces.boxes.astype(int).tolist(), pieces.symbols.tolist(), pieces.confs.tolist()):
             cv2.rectangle(vis, (x1, y1), (x2, y2), (0, 255, 0), 1)
-            label = f"{cls_name} {conf:.2f}"
+            label = f"{sym} {conf:.2f}"
             cv2.putText(vis, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
         return vis
 
     def processFrame(self, frame):
+        """Orient a camera frame for detection; drawing is left to the optional DebugViewer"""
         #frame = cv2.resize(frame, (640, 480))
-        frame = cv2.rotate(frame, cv2.ROTATE_180)
-
-        frame_vis = frame.copy()
-        frame_vis = self.visualizePieces(frame_vis, self.detectPieces(frame))
-        cv2.imshow("Detections", frame_vis)
-        return frame
+        return cv2.rotate(frame, cv2.ROTATE_180)
 
+    def processCorners(self, cornersH, shape) -> np.ndarray:
+        """Map points found on a raw camera frame of the given shape into processFrame coordinates"""
+        h, w = shape[:2]
+        pts = np.asarray(cornersH, dtype=np.float32).reshape(-1, 2)
+        return np.stack([w - 1 - pts[:, 0], h - 1 - pts[:, 1]], axis=1)
@@ -0,0 +1,114 @@
+"""
+FP32 vs INT8 accuracy/latency report
+Runs FEN.getFEN over labelled board frames with every model variant and compares the
+recognised FEN and per-frame latency. The manifest is a JSON file:
+    {"corners": [[x, y], ...],                    # cornersH shared by all frames (optional)
+     "frames": [{"image": "frames/0001.png", "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR",
+                 "corners": [[x, y], ...]}, ...]} # per-frame corners override the shared ones
+Image paths are relative to the manifest; frames are raw camera frames (rotated like playChess).
+"""
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from piece import Piece
+from hand import Hand
+from fen import FEN
+from backends import resolveModelPath
+
+
+def loadManifest(path):
+    with open(path) as f:
+        manifest = json.load(f)
+    root = os.path.dirname(os.path.abspath(path))
+    samples = []
+    for item in manifest["frames"]:
+        img = cv2.imread(os.path.join(root, item["image"]))
+        if img is None:
+            print(f"[REPORT] Skipping unreadable {item['image']}")
+            continue
+        corners = np.array(item.get("corners", manifest.get("corners")), dtype=np.float32)
+        samples.append((cv2.rotate(img, cv2.ROTATE_180), corners, item["fen"].split(" ")[0]))
+    return samples
+
+
+def squares(placement):
+    """64-char string of a FEN placement, '.' for empty"""
+    return "".join("." * int(ch) if ch.isdigit() else ch for ch in placement.replace("/", ""))
+
+
+def evaluate(variant, samples):
+    piece = Piece("models/modelPiece.pt", variant=variant)
+    hand = Hand(resolveModelPath("models/modelHand.pt", variant))
+    fen = FEN(1)
+
+    # Warm-up outside the timed loop
+    fen.getFEN(samples[0][0], samples[0][1], hand, piece)
+
+    times, exact, square_hits, missing = [], 0, 0, 0
+    for frame, corners, expected in samples:
+        t0 = time.perf_counter()
+        detected = fen.getFEN(frame, corners, hand, piece)
+        times.append((time.perf_counter() - t0) * 1000.0)
+        if detected is None:
+            missing += 1
+            continue
+        got = fen.getFigure(detected)
+        exact += got == expected
+        square_hits += sum(a == b for a, b in zip(squares(got), squares(expected)))
+
+    n = len(samples)
+    times = np.array(times)
+    return {
+        "variant": variant,
+        "fen_accuracy": exact / n,
+        "square_accuracy": square_hits / (64 * n),
+        "no_fen": missing,
+        "mean_ms": float(times.mean()),
+        "p95_ms": float(np.percentile(times, 95)),
+    }
+
+
+def render(rows, n):
+    base = rows[0]
+    lines = [
+        f"# Quantization report ({n} labelled frames)",
+        "",
+        "| variant | FEN acc | square acc | no FEN | mean ms | p95 ms | speedup |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for r in rows:
+        lines.append(f"| {r['variant']} | {r['fen_accuracy']:.1%} | {r['square_accuracy']:.2%} | {r['no_fen']} | "
+                     f"{r['mean_ms']:.1f} | {r['p95_ms']:.1f} | x{base['mean_ms'] / r['mean_ms']:.2f} |")
+    for r in rows[1:]:
+        lines.append("")
+        lines.append(f"{r['variant']} vs {base['variant']}: FEN accuracy "
+                     f"{(r['fen_accuracy'] - base['fen_accuracy']) * 100:+.1f} pts, square accuracy "
+                     f"{(r['square_accuracy'] - base['square_accuracy']) * 100:+.2f} pts")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FEN accuracy and latency of model variants")
+    parser.add_argument("manifest", help="JSON manifest of labelled frames")
+    parser.add_argument("--variants", default="fp32,int8")
+    parser.add_argument("--out", default=None, help="write the markdown report to this file")
+    args = parser.parse_args()
+
+    samples = loadManifest(args.manifest)
+    if not samples:
+        raise SystemExit("No labelled frames")
+    rows = [evaluate(v, samples) for v in args.variants.split(",")]
+    report = render(rows, len(samples))
+    print(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
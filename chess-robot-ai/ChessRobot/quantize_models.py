@@ -0,0 +1,91 @@
+"""
+INT8 quantization of the YOLO models
+Exports each .pt model to ONNX (if not already exported) and statically quantizes it with
+ONNX Runtime, calibrating on recorded board frames:
+    python quantize_models.py --calib test/calib_frames
+writes models/modelPiece_int8.onnx, models/modelHand_int8.onnx, models/modelCorner_int8.onnx
+which Piece/Hand/Corner pick up with CHESSROBOT_MODEL_VARIANT=int8.
+"""
+import argparse
+import os
+from pathlib import Path
+
+import onnx
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from backends import preprocess, resolveModelPath
+from bench_backends import loadRecordedFrames
+
+DEFAULT_MODELS = ["models/modelPiece.pt", "models/modelHand.pt", "models/modelCorner.pt"]
+
+
+def exportOnnx(pt_path: str, imgsz: int) -> str:
+    onnx_path = str(Path(pt_path).with_suffix(".onnx"))
+    if not os.path.exists(onnx_path):
+        from ultralytics import YOLO
+        onnx_path = YOLO(pt_path).export(format="onnx", imgsz=imgsz, simplify=True)
+    return onnx_path
+
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """onnxruntime CalibrationDataReader over recorded frames"""
+
+    def __init__(self, input_name, frames, imgsz):
+        self.input_name = input_name
+        self.frames = frames
+        self.imgsz = imgsz
+        self.index = 0
+
+    def get_next(self):
+        if self.index >= len(self.frames):
+            return None
+        blob, _ = preprocess([self.frames[self.index]], self.imgsz)
+        self.index += 1
+        return {self.input_name: blob}
+
+    def rewind(self):
+        self.index = 0
+
+
+def quantize(pt_path: str, frames, imgsz: int, per_channel: bool) -> str:
+    onnx_path = exportOnnx(pt_path, imgsz)
+    prep_path = str(Path(onnx_path).with_name(Path(onnx_path).stem + "_prep.onnx"))
+    quant_pre_process(onnx_path, prep_path)
+
+    input_name = onnx.load(prep_path).graph.input[0].name
+    reader = FrameCalibrationReader(input_name, frames, (imgsz, imgsz))
+
+    out_path = resolveModelPath(pt_path, "int8")
+    quantize_static(prep_path, out_path, reader,
+                    quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    per_channel=per_channel)
+    os.remove(prep_path)
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Produce INT8 variants of the YOLO models")
+    parser.add_argument("--calib", required=True, help="recorded video file or image directory")
+    parser.add_argument("--frames", type=int, default=200, help="max calibration frames")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--per-channel", action="store_true")
+    parser.add_argument("models", nargs="*", default=DEFAULT_MODELS)
+    args = parser.parse_args()
+
+    frames = loadRecordedFrames(args.calib, args.frames)
+    if not frames:
+        raise SystemExit(f"No calibration frames read from {args.calib}")
+    print(f"[QUANTIZE] {len(frames)} calibration frames from {args.calib}")
+
+    for pt_path in args.models:
+        out = quantize(pt_path, frames, args.imgsz, args.per_channel)
+        size_in = os.path.getsize(str(Path(pt_path).with_suffix(".onnx"))) / 1e6
+        size_out = os.path.getsize(out) / 1e6
+        print(f"[QUANTIZE] {pt_path} -> {out} ({size_in:.1f} MB -> {size_out:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
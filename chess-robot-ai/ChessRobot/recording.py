@@ -0,0 +1,203 @@
+"""
+Raw frame recording and deterministic replay
+FrameRecorder writes timestamped raw frames into a preallocated memory-mapped container
+(no codec, frame-accurate). ReplaySource reads it back with the cv2.VideoCapture read()
+interface, either at the recorded pace or as fast as the consumer reads, so playChess,
+getCorners and CameraStream can be driven from a recording on a machine without a camera.
+
+Container layout:
+    header (64 bytes): magic, version, height, width, channels, capacity, count
+    timestamps: capacity x float64 (seconds, time.time() at capture)
+    frames: capacity x height x width x channels uint8, page-aligned
+"""
+import argparse
+import logging
+import time
+
+import cv2
+import numpy as np
+
+from typing import Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"CRFRAMES"
+VERSION = 1
+HEADER = np.dtype([("magic", "S8"), ("version", "<u4"), ("height", "<u4"), ("width", "<u4"),
+                   ("channels", "<u4"), ("capacity", "<u8"), ("count", "<u8"), ("_pad", "V24")])
+PAGE = 4096
+
+
+def _layout(height: int, width: int, channels: int, capacity: int) -> Tuple[int, int]:
+    """(timestamps offset, frames offset) in bytes"""
+    ts_offset = HEADER.itemsize
+    frames_offset = -(-(ts_offset + capacity * 8) // PAGE) * PAGE
+    return ts_offset, frames_offset
+
+
+class FrameRecorder:
+    def __init__(self, path: str, max_frames: int = 3000):
+        """
+        Args:
+            path: Container file to create (overwritten)
+            max_frames: Capacity; the file is created sparse and frames past it are dropped
+        """
+        self.path = path
+        self.capacity = max_frames
+        self.count = 0
+        self.dropped = 0
+        self.header = None
+        self.timestamps = None
+        self.frames = None
+
+    def _open(self, shape):
+        h, w = shape[:2]
+        c = shape[2] if len(shape) > 2 else 1
+        ts_offset, frames_offset = _layout(h, w, c, self.capacity)
+        size = frames_offset + self.capacity * h * w * c
+        mm = np.memmap(self.path, dtype=np.uint8, mode="w+", shape=(size,))
+        self.mm = mm
+        self.header = mm[:HEADER.itemsize].view(HEADER)
+        self.header["magic"], self.header["version"] = MAGIC, VERSION
+        self.header["height"], self.header["width"], self.header["channels"] = h, w, c
+        self.header["capacity"], self.header["count"] = self.capacity, 0
+        self.timestamps = mm[ts_offset:ts_offset + self.capacity * 8].view(np.float64)
+        self.frames = mm[frames_offset:].reshape(self.capacity, h, w, c)
+        log.info("[RECORDER] Recording %dx%dx%d frames to %s (max %d)", w, h, c, self.path, self.capacity)
+
+    def write(self, frame: np.ndarray, ts: Optional[float] = None) -> bool:
+        """Append one frame; False once the container is full or the shape changed"""
+        if self.frames is None:
+            self._open(frame.shape)
+        if self.count >= self.capacity or frame.shape[:2] != self.frames.shape[1:3]:
+            self.dropped += 1
+            return False
+        self.frames[self.count] = frame.reshape(self.frames.shape[1:])
+        self.timestamps[self.count] = time.time() if ts is None else ts
+        self.count += 1
+        # Keep the count current so a crashed session is still readable
+        self.header["count"] = self.count
+        return True
+
+    def close(self):
+        if self.frames is not None:
+            self.mm.flush()
+            log.info("[RECORDER] Wrote %d frames to %s (%d dropped)", self.count, self.path, self.dropped)
+            del self.header, self.timestamps, self.frames, self.mm
+            self.frames = None
+
+
+class RecordingCapture:
+    """read() passthrough that also records every frame it returns"""
+
+    def __init__(self, cam, recorder: FrameRecorder):
+        self.cam = cam
+        self.recorder = recorder
+
+    def read(self):
+        ok, frame = self.cam.read()
+        if ok:
+            self.recorder.write(frame)
+        return ok, frame
+
+    def isOpened(self) -> bool:
+        return self.cam.isOpened()
+
+    def release(self):
+        self.recorder.close()
+        self.cam.release()
+
+
+class ReplaySource:
+    """cv2.VideoCapture-like reader of a FrameRecorder container"""
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False):
+        """
+        Args:
+            path: Container written by FrameRecorder
+            realtime: Pace read() by the recorded timestamps; False returns frames as fast as read
+            loop: Start over at the end instead of returning (False, None)
+        """
+        mm = np.memmap(path, dtype=np.uint8, mode="r")
+        header = mm[:HEADER.itemsize].view(HEADER)[0]
+        if header["magic"] != MAGIC:
+            raise ValueError(f"{path} is not a frame recording")
+        h, w, c = int(header["height"]), int(header["width"]), int(header["channels"])
+        capacity = int(header["capacity"])
+        ts_offset, frames_offset = _layout(h, w, c, capacity)
+        self.count = int(header["count"])
+        self.timestamps = mm[ts_offset:ts_offset + capacity * 8].view(np.float64)[:self.count]
+        frames = mm[frames_offset:frames_offset + capacity * h * w * c].reshape(capacity, h, w, c)
+        self.frames = frames[:self.count] if c > 1 else frames[:self.count, :, :, 0]
+        self.realtime = realtime
+        self.loop = loop
+        self.pos = 0
+        self.start = None
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Next frame; frames are read-only views into the recording"""
+        if self.pos >= self.count:
+            if not self.loop or self.count == 0:
+                return False, None
+            self.pos, self.start = 0, None
+        if self.realtime:
+            now = time.monotonic()
+            if self.start is None:
+                self.start = now - (self.timestamps[self.pos] - self.timestamps[0])
+            delay = self.start + (self.timestamps[self.pos] - self.timestamps[0]) - now
+            if delay > 0:
+                time.sleep(delay)
+        frame = self.frames[self.pos]
+        self.pos += 1
+        return True, frame
+
+    def isOpened(self) -> bool:
+        return self.pos < self.count or (self.loop and self.count > 0)
+
+    def get(self, prop_id) -> float:
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.count)
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.pos)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.frames.shape[1])
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.frames.shape[2])
+        if prop_id == cv2.CAP_PROP_FPS and self.count > 1:
+            return float((self.count - 1) / max(self.timestamps[-1] - self.timestamps[0], 1e-6))
+        return 0.0
+
+    def set(self, prop_id, value) -> bool:
+        return False
+
+    def release(self):
+        self.pos = self.count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record raw camera frames or inspect a recording")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rec = sub.add_parser("record")
+    rec.add_argument("path")
+    rec.add_argument("--camera", type=int, default=0)
+    rec.add_argument("--seconds", type=float, default=60)
+    rec.add_argument("--max-frames", type=int, default=3000)
+    info = sub.add_parser("info")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.cmd == "record":
+        cam = RecordingCapture(cv2.VideoCapture(args.camera), FrameRecorder(args.path, args.max_frames))
+        end = time.monotonic() + args.seconds
+        while time.monotonic() < end and cam.recorder.count < cam.recorder.capacity:
+            cam.read()
+        cam.release()
+    else:
+        src = ReplaySource(args.path, realtime=False)
+        print(f"{args.path}: {src.count} frames {int(src.get(cv2.CAP_PROP_FRAME_WIDTH))}x"
+              f"{int(src.get(cv2.CAP_PROP_FRAME_HEIGHT))} @ {src.get(cv2.CAP_PROP_FPS):.1f} fps")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
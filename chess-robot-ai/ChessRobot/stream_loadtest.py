@@ -0,0 +1,133 @@
+"""
+MJPEG stream load test
+Opens many local /stream clients and reports delivered fps per client and server CPU.
+    python stream_loadtest.py --clients 200 --duration 20            # spawns a synthetic server
+    python stream_loadtest.py --port 8000 --pid 1234 --clients 50   # against a running server
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def serve(port, server_type, fps):
+    """Synthetic-camera stream server, run in a child process by the load test"""
+    from camera_stream import CameraStream, MJPEGStreamServer, AsyncMJPEGStreamServer
+
+    class SyntheticCam:
+        def __init__(self):
+            self.rng = np.random.default_rng(0)
+            self.base = self.rng.integers(0, 255, (360, 480, 3), dtype=np.uint8)
+            self.i = 0
+
+        def read(self):
+            self.i += 1
+            frame = self.base.copy()
+            frame[(self.i * 4) % 360:(self.i * 4) % 360 + 20] = 255
+            return True, frame
+
+    camera_stream = CameraStream(width=480, height=360, fps=fps)
+    camera_stream.start_capture(cam=SyntheticCam())
+    cls = AsyncMJPEGStreamServer if server_type == "async" else MJPEGStreamServer
+    server = cls(camera_stream, host='127.0.0.1', port=port)
+    server.start()
+    while True:
+        time.sleep(1)
+
+
+def cpuSeconds(pid):
+    """utime + stime of a process from /proc (Linux)"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+BOUNDARY = b"--jpgboundary\r\n"
+
+
+async def client(host, port, duration, stats, idx):
+    frames, nbytes = 0, 0
+    # Bytes kept from the previous chunk so a boundary split across two reads is still counted
+    tail = b""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b"GET /stream HTTP/1.0\r\nHost: x\r\n\r\n")
+        await writer.drain()
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            chunk = await asyncio.wait_for(reader.read(65536), timeout=5)
+            if not chunk:
+                break
+            nbytes += len(chunk)
+            # The seam holds only boundaries that straddle the two reads, never one counted twice
+            keep = len(BOUNDARY) - 1
+            frames += chunk.count(BOUNDARY) + (tail + chunk[:keep]).count(BOUNDARY)
+            tail = (tail + chunk)[-keep:] if len(chunk) < keep else chunk[-keep:]
+        writer.close()
+    except Exception as e:
+        stats["errors"].append(f"client {idx}: {e!r}")
+    stats["frames"][idx] = frames
+    stats["bytes"][idx] = nbytes
+
+
+async def run(args):
+    stats = {"frames": [0] * args.clients, "bytes": [0] * args.clients, "errors": []}
+    tasks = []
+    for i in range(args.clients):
+        tasks.append(asyncio.create_task(client(args.host, args.port, args.duration, stats, i)))
+        if i % 50 == 49:
+            await asyncio.sleep(0.05)
+    await asyncio.gather(*tasks)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the MJPEG stream server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--pid", type=int, default=None, help="server pid to sample CPU from")
+    parser.add_argument("--server", choices=["async", "threaded"], default="async",
+                        help="server type to spawn when --pid is not given")
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.server, args.fps)
+        return
+
+    child = None
+    pid = args.pid
+    if pid is None:
+        child = subprocess.Popen([sys.executable, __file__, "--serve", "--port", str(args.port),
+                                  "--server", args.server, "--fps", str(args.fps)])
+        pid = child.pid
+        time.sleep(2.0)
+
+    try:
+        cpu0, t0 = cpuSeconds(pid), time.monotonic()
+        stats = asyncio.run(run(args))
+        cpu1, t1 = cpuSeconds(pid), time.monotonic()
+    finally:
+        if child is not None:
+            child.terminate()
+            child.wait()
+
+    fps = np.array(stats["frames"]) / args.duration
+    mbps = sum(stats["bytes"]) * 8 / args.duration / 1e6
+    print(f"[LOADTEST] {args.clients} clients x {args.duration:.0f}s against pid {pid}")
+    print(f"[LOADTEST] delivered fps per client: mean {fps.mean():.1f}  min {fps.min():.1f}  max {fps.max():.1f}")
+    print(f"[LOADTEST] total throughput: {mbps:.1f} Mbit/s")
+    print(f"[LOADTEST] server CPU: {(cpu1 - cpu0) / (t1 - t0) * 100:.1f}% of one core")
+    if stats["errors"]:
+        print(f"[LOADTEST] {len(stats['errors'])} client errors, first: {stats['errors'][0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import asyncio
+import importlib
+import json
+import sys
+import types
+
+import chess
+import pytest
+
+
+def _standIn(name, **attrs):
+    """Register a minimal module when the robot's core/network packages are not on the path"""
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+
+
+class _Processor:
+    def get_processing_size(self):
+        return 640
+
+
+_standIn("core")
+_standIn("core.chess_mapping", ChessMapper=type("ChessMapper", (), {}))
+_standIn("core.chess_processing", ChessProcessor=_Processor)
+_standIn("network")
+_standIn("network.socket_client", TCPClient=type("TCPClient", (), {}))
+
+from fen import FEN  # noqa: E402
+
+CASTLES = "r3k2r/pppq1ppp/2npbn2/4p3/2B1P3/2NP1N2/PPPQ1PPP/R3K2R w KQkq - 0 1"
+
+
+class Engine:
+    """Stands in for chess.engine.UciProtocol: answers with e7e5 when legal, else the first legal move"""
+    def __init__(self):
+        self.analysed = []
+
+    async def configure(self, options):
+        pass
+
+    async def analyse(self, board, limit):
+        self.analysed.append(board.fen())
+        move = chess.Move.from_uci("e7e5")
+        if move not in board.legal_moves:
+            move = next(iter(board.legal_moves))
+        return {"pv": [move]}
+
+
+class Client:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, data):
+        self.sent.append(json.loads(data))
+
+
+class Recorder:
+    def __init__(self):
+        self.decisions = []
+        self.dumps = []
+
+    def decide(self, decision, fen_last):
+        self.decisions.append(decision)
+
+    def dump(self, reason, game_id=None, fen_last=None):
+        self.dumps.append(reason)
+
+
+def observed(fen, remove=(), put=()):
+    board = chess.Board(fen)
+    for sq in remove:
+        board.remove_piece_at(sq)
+    for sq, sym in put:
+        board.set_piece_at(sq, chess.Piece.from_symbol(sym))
+    return board.fen()
+
+
+@pytest.fixture
+def fen():
+    f = FEN(1)
+    f.blackbox = Recorder()
+    return f
+
+
+def update(f, seen, engine=None, client=None):
+    engine = engine or Engine()
+    client = client or Client()
+    asyncio.run(f.updateFEN(seen, engine, client, game_id="g"))
+    return engine, client
+
+
+def test_e2e4_sends_reply(fen):
+    engine, client = update(fen, observed(chess.STARTING_FEN, remove=[chess.E2], put=[(chess.E4, "P")]))
+    assert fen.blackbox.decisions == ["move"]
+    assert fen.board.move_stack == [chess.Move.from_uci("e2e4")]
+    assert len(engine.analysed) == 1
+    [message] = client.sent
+    assert message["type"] == "new_move"
+    assert message["game_id"] == "g"
+    assert message["fen_str"] == fen.FEN_last
+    assert (message["move"]["from"], message["move"]["to"]) == ("e7", "e5")
+
+
+def test_e2e4_without_engine_turn(fen):
+    fen.side = "w"
+    engine, client = update(fen, observed(chess.STARTING_FEN, remove=[chess.E2], put=[(chess.E4, "P")]))
+    assert fen.board.move_stack == [chess.Move.from_uci("e2e4")]
+    assert engine.analysed == []
+    assert [m["type"] for m in client.sent] == ["new_move"]
+
+
+def test_illegal_king_move(fen):
+    start = fen.FEN_last
+    engine, client = update(fen, observed(chess.STARTING_FEN, remove=[chess.E1], put=[(chess.E3, "K")]))
+    assert fen.blackbox.decisions == ["illegal_move"]
+    assert fen.FEN_last == start
+    assert not fen.checkMove
+    assert engine.analysed == []
+    [message] = client.sent
+    assert message["type"] == "illegal_move"
+    assert message["player"] == "white"
+    assert message["move"] == {"from": "e1", "to": "e3", "piece": "K", "move_type": "move"}
+    assert message["current_fen"] == start
+    assert fen.blackbox.dumps == ["illegal_move"]
+
+
+def test_unchanged(fen):
+    _, client = update(fen, chess.STARTING_FEN)
+    assert fen.blackbox.decisions == ["unchanged"]
+    assert client.sent == []
+
+
+def test_castling(fen):
+    fen.FEN_last = CASTLES
+    update(fen, observed(CASTLES, remove=[chess.E1, chess.H1], put=[(chess.G1, "K"), (chess.F1, "R")]))
+    assert fen.blackbox.decisions == ["castling"]
+    assert fen.board.move_stack == [chess.Move.from_uci("e1g1")]
+
+
+def test_half_finished_castle(fen):
+    fen.FEN_last = CASTLES
+    _, client = update(fen, observed(CASTLES, remove=[chess.E1], put=[(chess.G1, "K")]))
+    assert fen.blackbox.decisions == ["no_move"]
+    assert fen.FEN_last == chess.Board(CASTLES).fen()
+    assert client.sent == []
+
+
+def test_multiple_changes(fen):
+    start = fen.FEN_last
+    _, client = update(fen, observed(chess.STARTING_FEN, remove=[chess.B1, chess.G1],
+                                     put=[(chess.B3, "N"), (chess.G3, "N")]))
+    assert fen.blackbox.decisions == ["multiple_changes"]
+    assert fen.FEN_last == start
+    assert client.sent == []
@@ -0,0 +1,120 @@
+import chess
+import pytest
+
+from move_infer import MoveIndex, castlingInProgress, describeChange
+
+START = chess.STARTING_FEN
+CASTLES = "r3k2r/pppq1ppp/2npbn2/4p3/2B1P3/2NP1N2/PPPQ1PPP/R3K2R w KQkq - 0 1"
+
+
+def after(fen, san):
+    board = chess.Board(fen)
+    board.push_san(san)
+    return board
+
+
+def edited(fen, remove=(), put=()):
+    board = chess.Board(fen)
+    for sq in remove:
+        board.remove_piece_at(sq)
+    for sq, sym in put:
+        board.set_piece_at(sq, chess.Piece.from_symbol(sym))
+    return board
+
+
+def lookup(fen, observed, k=1):
+    return MoveIndex(chess.Board(fen)).lookup(observed.board_fen(), k)
+
+
+def test_normal_move():
+    match = lookup(START, after(START, "e4"))
+    assert match.move == chess.Move.from_uci("e2e4")
+    assert match.distance == (0, 0)
+    assert match.stay[0] == 2
+
+
+def test_unchanged_position():
+    match = lookup(START, chess.Board(START))
+    assert match.move is None
+    assert match.stay == (0, 0)
+
+
+@pytest.mark.parametrize("san, uci", [("O-O", "e1g1"), ("O-O-O", "e1c1")])
+def test_castling(san, uci):
+    board = chess.Board(CASTLES)
+    match = lookup(CASTLES, after(CASTLES, san))
+    assert match.move == chess.Move.from_uci(uci)
+    assert board.is_castling(match.move)
+
+
+@pytest.mark.parametrize("king_to", [chess.G1, chess.C1])
+def test_half_finished_castle(king_to):
+    # King already moved, rook still on its corner: no legal move is within reach
+    observed = edited(CASTLES, remove=[chess.E1], put=[(king_to, "K")])
+    board = chess.Board(CASTLES)
+    assert lookup(CASTLES, observed).move is None
+    vacated, arrived = describeChange(board, observed)
+    assert castlingInProgress(board, vacated, arrived) == chess.Move(chess.E1, king_to)
+
+
+def test_half_castle_needs_castling_rights():
+    fen = "r3k2r/8/8/8/8/8/8/R3K2R w Qkq - 0 1"
+    observed = edited(fen, remove=[chess.E1], put=[(chess.G1, "K")])
+    board = chess.Board(fen)
+    assert castlingInProgress(board, *describeChange(board, observed)) is None
+
+
+def test_en_passant():
+    fen = "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1"
+    match = lookup(fen, after(fen, "exd6"))
+    assert match.move == chess.Move.from_uci("e5d6")
+    assert chess.Board(fen).is_en_passant(match.move)
+
+
+@pytest.mark.parametrize("uci", ["a7a8q", "a7a8n"])
+def test_promotion(uci):
+    fen = "7k/P7/8/8/8/8/8/K7 w - - 0 1"
+    board = chess.Board(fen)
+    board.push_uci(uci)
+    assert lookup(fen, board).move == chess.Move.from_uci(uci)
+
+
+def test_missed_piece_matches_at_distance_one():
+    # e4 played, but the g2 pawn was not detected
+    observed = edited(START, remove=[chess.E2, chess.G2], put=[(chess.E4, "P")])
+    match = lookup(START, observed)
+    assert match.move == chess.Move.from_uci("e2e4")
+    assert match.distance == (1, 0)
+    assert match.distance < match.stay
+
+
+def test_misclassified_piece_breaks_tie_by_type():
+    # e4 played, king seen as a queen: same occupancy, one wrong piece type
+    observed = edited(START, remove=[chess.E2], put=[(chess.E4, "P"), (chess.E1, "Q")])
+    match = lookup(START, observed)
+    assert match.move == chess.Move.from_uci("e2e4")
+    assert match.distance == (0, 1)
+
+
+def test_two_errors_exceed_k():
+    observed = edited(START, remove=[chess.E2, chess.G2, chess.H2], put=[(chess.E4, "P")])
+    assert lookup(START, observed, k=1).move is None
+    assert lookup(START, observed, k=2).move == chess.Move.from_uci("e2e4")
+
+
+def test_illegal_single_piece_move():
+    # Knight b1 -> b3: one vacated and one arrived square, no legal move within k
+    observed = edited(START, remove=[chess.B1], put=[(chess.B3, "N")])
+    board = chess.Board(START)
+    assert lookup(START, observed).move is None
+    vacated, arrived = describeChange(board, observed)
+    assert (vacated, arrived) == ([chess.B1], [chess.B3])
+    assert castlingInProgress(board, vacated, arrived) is None
+
+
+def test_multiple_changes():
+    # Two pieces of the side to move displaced at once
+    observed = edited(START, remove=[chess.B1, chess.G1], put=[(chess.B3, "N"), (chess.G3, "N")])
+    assert lookup(START, observed).move is None
+    vacated, arrived = describeChange(chess.Board(START), observed)
+    assert len(vacated) == 2 and len(arrived) == 2
@@ -1,4 +1,7 @@
 import logging
+import logging.handlers
+import os
+import queue
 import asyncio
 import json
 from datetime import datetime
@@ -8,6 +11,8 @@ from fairino import Robot
 # import websockets
 
 
+logger = logging.getLogger("code_robot")
+
 CELL_LENGTH = 40
 ROBOT_IP_ADDRESS = '192.168.58.2'
 
@@ -194,15 +199,15 @@ async def attack_async(from_piece, _from, to_piece, to, goal_id=None):
 
     x1, y1, z1 = convert_chessboard_to_robot(from_piece, _from)  # Returns (20, 20, 43)
     x2, y2, z2 = convert_chessboard_to_robot(to_piece, to)
-    print(from_piece, x1, y1, z1)
-    print(to_piece, x2, y2, z2)
+    logger.debug("%s %s %s %s", from_piece, x1, y1, z1)
+    logger.debug("%s %s %s %s", to_piece, x2, y2, z2)
 
     # Các vị trí nghĩa địa
     p0 = [160, 160, 250, -179.000, -0.964, -139.097]
     p1 = [x2, y2, 140, -179.000, -0.964, -139.097]
     p2 = [x2, y2, z2, -179.000, -0.964, -139.097]
-    print("so lan an ",white_index)
-    print("so lan an ",black_index)
+    logger.debug("so lan an %s", white_index)
+    logger.debug("so lan an %s", black_index)
     if split_piece_color(to_piece) == 'white':
         p3 = [380, 20 + ((white_index % 8) * CELL_LENGTH), 140, -179.000, -0.964, -139.097]
         p4 = [380, 20 + ((white_index % 8) * CELL_LENGTH), z2 - board_height, -179.000, -0.964, -139.097]
@@ -226,7 +231,7 @@ async def attack_async(from_piece, _from, to_piece, to, goal_id=None):
     vel = float(robot_config['max_speed'])
     blendR = 0.0
 
-    print("Starting attack sequence...")
+    logger.info("Starting attack sequence...")
 
     # await pub_feedback(goal_id=goal_id, step="preparing", step_details="moving_to_home_position", progress=0.05,
                     #    estimated_time=14.0, position_info={"moving_to": "home", "purpose": "preparation"})
@@ -328,7 +333,7 @@ async def attack_async(from_piece, _from, to_piece, to, goal_id=None):
     rtn = robot.MoveL(desc_pos=p0, tool=tool_id, user=user, vel=vel, blendR=blendR)
 
     robot.ServoMoveStart()
-    print("Attack sequence completed!")
+    logger.info("Attack sequence completed!")
     return
 
 async def move_async(from_piece, _from, to_piece, to, goal_id=None):
@@ -352,7 +357,7 @@ async def move_async(from_piece, _from, to_piece, to, goal_id=None):
     vel = float(robot_config['max_speed'])
     blendR = 0.0
 
-    print("Starting attack sequence...")
+    logger.info("Starting attack sequence...")
 
     # await pub_feedback(goal_id=goal_id, step="preparing", step_details="moving_to_home_position", progress=0.05,
                     #    estimated_time=14.0, position_info={"moving_to": "home", "purpose": "preparation"})
@@ -408,7 +413,7 @@ async def move_async(from_piece, _from, to_piece, to, goal_id=None):
     rtn = robot.MoveL(desc_pos=p0, tool=tool_id, user=user, vel=vel, blendR=blendR)
 
     robot.ServoMoveStart()
-    print("Move sequence completed!")
+    logger.info("Move sequence completed!")
     return
 
 async def kingside_castle_async(from_piece, _from, to_piece, to, goal_id=None):
@@ -416,8 +421,8 @@ async def kingside_castle_async(from_piece, _from, to_piece, to, goal_id=None):
 
     x1, y1, z1 = convert_chessboard_to_robot(from_piece, _from)
     x2, y2, z2 = convert_chessboard_to_robot(to_piece, to)
-    print(from_piece, x1, y1, z1)
-    print(to_piece, x2, y2, z2)
+    logger.debug("%s %s %s %s", from_piece, x1, y1, z1)
+    logger.debug("%s %s %s %s", to_piece, x2, y2, z2)
 
     """Async version of castle function"""
     # Các vị trí nghĩa địa
@@ -445,8 +450,8 @@ async def kingside_castle_async(from_piece, _from, to_piece, to, goal_id=None):
         p8 = [220, 300, z2, -179.000, -0.964, -139.097]
         king_position = "g8"
         rook_position = "f8"
-    print(rook_position)
-    print(king_position)
+    logger.debug("%s", rook_position)
+    logger.debug("%s", king_position)
     # Các tham số robot
     gripper_id = 1
     gripper_max_time = 30000
@@ -456,7 +461,7 @@ async def kingside_castle_async(from_piece, _from, to_piece, to, goal_id=None):
     vel = float(robot_config['max_speed'])
     blendR = 0.0
 
-    print("Starting castle sequence...")
+    logger.info("Starting castle sequence...")
 
     # await pub_feedback(goal_id=goal_id, step="preparing", step_details="moving_to_home_position", progress=0.05,
                         # estimated_time=14.0, position_info={"moving_to": "home", "purpose": "preparation"})
@@ -553,7 +558,7 @@ async def kingside_castle_async(from_piece, _from, to_piece, to, goal_id=None):
     rtn = robot.MoveL(desc_pos=p0, tool=tool_id, user=user, vel=vel, blendR=blendR)
 
     robot.ServoMoveStart()
-    print("Castle sequence completed!")
+    logger.info("Castle sequence completed!")
     return
 
 async def queenside_castle_async(from_piece, _from, to_piece, to, goal_id=None):
@@ -561,8 +566,8 @@ async def queenside_castle_async(from_piece, _from, to_piece, to, goal_id=None):
 
     x1, y1, z1 = convert_chessboard_to_robot(from_piece, _from)
     x2, y2, z2 = convert_chessboard_to_robot(to_piece, to)
-    print(from_piece, x1, y1, z1)
-    print(to_piece, x2, y2, z2)
+    logger.debug("%s %s %s %s", from_piece, x1, y1, z1)
+    logger.debug("%s %s %s %s", to_piece, x2, y2, z2)
 
     """Async version of castle function"""
     # Các vị trí định nghĩa
@@ -600,7 +605,7 @@ async def queenside_castle_async(from_piece, _from, to_piece, to, goal_id=None):
     vel = float(robot_config['max_speed'])
     blendR = 0.0
 
-    print("Starting attack sequence...")
+    logger.info("Starting attack sequence...")
 
     # await pub_feedback(goal_id=goal_id, step="preparing", step_details="moving_to_home_position", progress=0.05,
                     #    estimated_time=14.0, position_info={"moving_to": "home", "purpose": "preparation"})
@@ -697,9 +702,8 @@ async def queenside_castle_async(from_piece, _from, to_piece, to, goal_id=None):
     rtn = robot.MoveL(desc_pos=p0, tool=tool_id, user=user, vel=vel, blendR=blendR)
 
     robot.ServoMoveStart()
-    print("Castle sequence completed!")
+    logger.info("Castle sequence completed!")
     return
-# logger = logging.getLogger(__name__)
 
 
 # def handle_goal(payload: bytes):
@@ -735,40 +739,40 @@ def handle_robot_command(payload):
     command_payload = payload.get('Payload', {})
 
     if command_type == 'update_config':
-        print(f"Updating robot config...")
+        logger.info("Updating robot config...")
 
         # Update speed
         if 'speed' in command_payload:
             robot_config['speed'] = command_payload['speed']
             robot.SetSpeed(command_payload['speed'])
-            print(f"Speed: {command_payload['speed']}")
+            logger.info("Speed: %s", command_payload['speed'])
 
         # Update gripper speed
         if 'gripperSpeed' in command_payload:
             robot_config['gripper_speed'] = command_payload['gripperSpeed']
-            print(f"Gripper Speed: {command_payload['gripperSpeed']}")
+            logger.info("Gripper Speed: %s", command_payload['gripperSpeed'])
 
         # Update gripper force
         if 'gripperForce' in command_payload:
             robot_config['gripper_force'] = command_payload['gripperForce']
-            print(f"Gripper Force: {command_payload['gripperForce']}")
+            logger.info("Gripper Force: %s", command_payload['gripperForce'])
 
         # Update max speed
         if 'maxSpeed' in command_payload:
             robot_config['max_speed'] = command_payload['maxSpeed']
-            print(f"Max Speed: {command_payload['maxSpeed']}")
+            logger.info("Max Speed: %s", command_payload['maxSpeed'])
 
-        print(f"Config updated successfully: {robot_config}")
+        logger.info("Config updated successfully: %s", robot_config)
 
     elif command_type == 'set_speed':
         speed = command_payload.get('speed')
         if speed:
             robot_config['speed'] = speed
             robot.SetSpeed(speed)
-            print(f"Speed set to: {speed}")
+            logger.info("Speed set to: %s", speed)
 
     else:
-        print(f"Unknown command type: {command_type}")
+        logger.warning("Unknown command type: %s", command_type)
 
 async def tcp_client():
     reader, writer = await asyncio.open_connection(tcp_ip, 8080)
@@ -795,7 +799,7 @@ async def tcp_client():
         if not data:
             break
 
-        print(f"Received: {data}")
+        logger.debug("Received: %s", data)
 
         try:
             payload = json.loads(data)
@@ -811,29 +815,29 @@ async def tcp_client():
 
                 if move_type == 'attack':
                     result = await attack_async(from_piece, _from, to_piece, to, goal_id)
-                    print("result:", result)
+                    logger.info("result: %s", result)
                 elif move_type == 'move':
                     result = await move_async(from_piece, _from, to_piece, to, goal_id)
-                    print("result:", result)
+                    logger.info("result: %s", result)
                 elif move_type == 'castle':
                     if to == 'h1' or to == 'h8':
                         result = await kingside_castle_async(from_piece, _from, to_piece, to, goal_id)
-                        print("kingside_castle result:", result)
+                        logger.info("kingside_castle result: %s", result)
                     else:
                         result = await queenside_castle_async(from_piece, _from, to_piece, to, goal_id)
-                        print("queenside_castle result:", result)
+                        logger.info("queenside_castle result: %s", result)
 
             # Handle robot control commands
             elif payload.get('CommandType'):
                 handle_robot_command(payload)
 
             else:
-                print(f"Unknown message format: {payload}")
+                logger.warning("Unknown message format: %s", payload)
 
         except json.JSONDecodeError as e:
-            print(f"JSON parse error: {e}")
+            logger.error("JSON parse error: %s", e)
         except Exception as e:
-            print(f"Error processing message: {e}")
+            logger.error("Error processing message: %s", e)
 
     robot.CloseRPC()
     # writer.close()
@@ -843,6 +847,17 @@ async def tcp_client():
 
 if __name__ == '__main__':
     formatter = "[%(asctime)s] %(name)s {%(filename)s:%(lineno)d} %(levelname)s - %(message)s"
-    logging.basicConfig(level=logging.INFO, format=formatter)
+    # Log calls only enqueue; one listener thread writes, so stdout never stalls robot control
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(formatter))
+    listener = logging.handlers.QueueListener(records, handler)
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(os.environ.get("CODE_ROBOT_LOG_LEVEL", "INFO").upper())
+    listener.start()
     # asyncio.get_event_loop().run_until_complete(sub_robot_topics())
-    asyncio.run(tcp_client())
\ No newline at end of file
+    try:
+        asyncio.run(tcp_client())
+    finally:
+        listener.stop()
\ No newline at end of file